@@ -1,32 +1,73 @@
 """Administrator interface"""
 
 import sys
+import time
+import argparse
+import locale
 import logging
-import tkinter as tk
 
 from tkinter import messagebox
 
 from logic.gui_logic import ask_for_password, AdminMainWindow
 from logic.db_logic import (
     LibraryDatabase,
+    DatabaseException,
     DatabaseLoadError,
     InvalidDatabaseStructureError,
 )
-from config import DB_PATH
-from logic.gui_utils import resource_path, setup_logging
+from config import CHANGE_FEED_DIR, DB_PATH, POPULARITY_CAPACITY, UNDO_HISTORY_DEPTH
+from logic.gui_utils import get_root, resource_path, setup_logging
+from logic.profiling_logic import SessionProfiler, profiling_from_env, PROFILE_ENV_VAR
 
 
 if __name__ == "__main__":
-    setup_logging(resource_path("./admin_log.txt"))
+    parser = argparse.ArgumentParser(description="Library management administrator")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=f"profile whole session (or set {PROFILE_ENV_VAR}=1)",
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help=f"also trace memory of DB load/save (or set {PROFILE_ENV_VAR}=memory)",
+    )
+    args = parser.parse_args()
+    env_profile, env_profile_memory = profiling_from_env()
+
+    log_path = resource_path("./admin_log.txt")
+    setup_logging(log_path)
+    started = time.perf_counter()
     logging.info("Started.")
-    libraries_db = LibraryDatabase()
+    profiler = SessionProfiler(
+        log_path.parent, args.profile_memory or env_profile_memory
+    )
+    if args.profile or args.profile_memory or env_profile:
+        profiler.start()
+    try:
+        # Libraries lists are sorted with user's locale rules
+        locale.setlocale(locale.LC_COLLATE, "")
+    except locale.Error:
+        logging.warning("Failed to set user's collation locale, using default")
+    libraries_db = LibraryDatabase(UNDO_HISTORY_DEPTH, POPULARITY_CAPACITY)
+    profiler.wrap_database(libraries_db)
     try:
         libraries_db.load_data(DB_PATH)
         logging.info("Data loaded. Requesting password...")
+        if CHANGE_FEED_DIR is not None:
+            try:
+                libraries_db.enable_change_feed(CHANGE_FEED_DIR)
+            except DatabaseException:
+                logging.warning("Working without change feed")
 
         if ask_for_password(libraries_db):
             logging.info("Password accepted. Initializing root...")
-            root = AdminMainWindow(libraries_db)
+            root = AdminMainWindow(libraries_db, profiler)
+            root.after_idle(
+                lambda: logging.info(
+                    f"Interactive in {time.perf_counter() - started:.3f}s"
+                )
+            )
             root.mainloop()
         else:
             logging.warning("Dialog closed. Interputting...")
@@ -51,8 +92,7 @@ if __name__ == "__main__":
     except Exception as e:
         logging.exception("A critical unexpected error occured, interputting...")
         try:
-            error_root = tk.Tk()
-            error_root.withdraw()
+            error_root = get_root()
 
             messagebox.showerror("CRITICAL ERROR", f"A critical error occurred:\n{e}\n\nApplication will be interputted\n Contact system administrator")  # type: ignore
             error_root.destroy()
@@ -61,3 +101,10 @@ if __name__ == "__main__":
             logging.exception("Failed to show critical error msgbox:")
 
         sys.exit(1)
+
+    finally:
+        if profiler.is_running:
+            try:
+                profiler.stop()
+            except OSError:
+                logging.exception("Failed to write profiling reports:")
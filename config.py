@@ -1,4 +1,5 @@
-"""Configuration file. Contains DB_PATH & ICON_PATH"""
+"""Configuration file. Contains DB_PATH, ICON_PATH, UNDO_HISTORY_DEPTH,
+POPULARITY_CAPACITY & CHANGE_FEED_DIR"""
 
 from logic.gui_utils import resource_path
 from pathlib import Path
@@ -8,3 +9,12 @@ DB_PATH: Path = resource_path("./libs_data.json")
 
 # CHANGE THIS TO USE CUSTOM ICON / ИЗМЕНИТЕ ЭТО ДЛЯ СВОЕЙ ИКОНКИ
 ICON_PATH: Path = resource_path("./img/book.png")
+
+# HOW MANY ADMIN ACTIONS CAN BE UNDONE / СКОЛЬКО ДЕЙСТВИЙ МОЖНО ОТМЕНИТЬ
+UNDO_HISTORY_DEPTH: int = 100
+
+# HOW MANY BOOKS ARE COUNTED FOR POPULARITY, MORE IS MORE PRECISE / СКОЛЬКО КНИГ УЧИТЫВАЕТСЯ В ПОПУЛЯРНОСТИ, БОЛЬШЕ - ТОЧНЕЕ
+POPULARITY_CAPACITY: int = 1000
+
+# CHANGES FEED FOR OTHER SYSTEMS, e.g. resource_path("./changes") / ЛЕНТА ИЗМЕНЕНИЙ ДЛЯ ДРУГИХ СИСТЕМ
+CHANGE_FEED_DIR: Path | None = None
@@ -0,0 +1,216 @@
+"""asyncio facade for LibraryDatabase"""
+
+import asyncio
+import functools
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+from logic.db_logic import LibraryDatabase, MergeReport
+from logic.mvcc_logic import Snapshot
+from logic.loan_logic import Loan
+from logic.query_logic import Predicate
+from logic.search_logic import DEFAULT_PAGE_SIZE
+
+# Default number of threads for file I/O and for password hashing
+DEFAULT_IO_WORKERS = 1
+DEFAULT_HASH_WORKERS = 2
+
+_Result = TypeVar("_Result")
+
+
+class AsyncLibraryDatabase:
+    """LibraryDatabase for asyncio services.
+
+    Loading, saving and merging files run in I/O thread pool, PBKDF2 hashing
+    runs in hashing thread pool (hashlib releases GIL, so hashes are computed
+    in parallel). Pools are bounded: extra calls wait in event loop, not in
+    pool queue, so they can be cancelled. Writers are serialized with an
+    asyncio lock. Read methods are plain and never wait for writers: they
+    read published immutable snapshot only, while load and merge build the
+    next version in I/O thread and publish it when they finish.
+    Changes are notified from pool threads, so GUI must not subscribe to
+    wrapped db."""
+
+    def __init__(
+        self,
+        db: LibraryDatabase | None = None,
+        io_workers: int = DEFAULT_IO_WORKERS,
+        hash_workers: int = DEFAULT_HASH_WORKERS,
+    ) -> None:
+        if io_workers < 1 or hash_workers < 1:
+            raise ValueError("Workers count must be positive.")
+        self.db = db if db is not None else LibraryDatabase()
+        self._io_executor = ThreadPoolExecutor(
+            io_workers, thread_name_prefix="library-io"
+        )
+        self._hash_executor = ThreadPoolExecutor(
+            hash_workers, thread_name_prefix="library-hash"
+        )
+        self._io_slots = asyncio.Semaphore(io_workers)
+        self._hash_slots = asyncio.Semaphore(hash_workers)
+        self._write_lock = asyncio.Lock()
+
+    async def __aenter__(self) -> "AsyncLibraryDatabase":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Wait for running jobs and stop thread pools"""
+        loop = asyncio.get_running_loop()
+        for executor in (self._io_executor, self._hash_executor):
+            await loop.run_in_executor(None, executor.shutdown)
+        logging.debug("AsyncLibraryDatabase closed")
+
+    async def load(self, file_path: Path) -> None:
+        """Load data from file (see LibraryDatabase.load_data)"""
+        async with self._write_lock:
+            await self._run_io(self.db.load_data, file_path, show_loading=False)
+
+    async def merge(self, file_path: Path) -> MergeReport:
+        """Apply changes made in file (see LibraryDatabase.merge_data)"""
+        async with self._write_lock:
+            return await self._run_io(
+                self.db.merge_data, file_path, show_loading=False
+            )
+
+    async def save(self, file_path: Path, indent: int | None = None) -> None:
+        """Save data to file (see LibraryDatabase.save_data)"""
+        async with self._write_lock:
+            await self._run_io(self.db.save_data, file_path, indent)
+
+    async def verify_password(self, password: str) -> bool:
+        """Check administrator password without blocking event loop"""
+        async with self._hash_slots:
+            return await self._run(
+                self._hash_executor, self.db.verify_password, password
+            )
+
+    async def update_admin_password(self, new_password: str) -> None:
+        """Hash and set new administrator password"""
+        async with self._write_lock, self._hash_slots:
+            await self._run(
+                self._hash_executor, self.db.update_admin_password, new_password
+            )
+
+    async def add_library(self, name: str, city: str, address: str) -> None:
+        """Add a new library (see LibraryDatabase.add_library)"""
+        async with self._write_lock:
+            self.db.add_library(name, city, address)
+
+    async def add_libraries(self, libs_info: list[tuple[str, str, str]]) -> None:
+        """Add many libraries at once (see LibraryDatabase.add_libraries)"""
+        async with self._write_lock:
+            self.db.add_libraries(libs_info)
+
+    async def edit_library_data(
+        self, lib_name: str, type_of_edit: str, new_value: str
+    ) -> None:
+        """Edit library (see LibraryDatabase.edit_library_data)"""
+        async with self._write_lock:
+            self.db.edit_library_data(lib_name, type_of_edit, new_value)
+
+    async def delete_library(self, library_name: str) -> None:
+        """Delete library (see LibraryDatabase.delete_library)"""
+        async with self._write_lock:
+            self.db.delete_library(library_name)
+
+    async def update_where(
+        self, predicates: list[Predicate], type_of_edit: str, new_value: str
+    ) -> int:
+        """Bulk update (see LibraryDatabase.update_where)"""
+        async with self._write_lock:
+            return self.db.update_where(predicates, type_of_edit, new_value)
+
+    async def delete_where(self, predicates: list[Predicate]) -> int:
+        """Bulk delete (see LibraryDatabase.delete_where)"""
+        async with self._write_lock:
+            return self.db.delete_where(predicates)
+
+    async def borrow_book(
+        self, lib_name: str, book_id: str, client: str, due_at: datetime
+    ) -> Loan:
+        """Borrow book (see LibraryDatabase.borrow_book)"""
+        async with self._write_lock:
+            return self.db.borrow_book(lib_name, book_id, client, due_at)
+
+    async def return_book(self, lib_name: str, book_id: str) -> Loan:
+        """Return book (see LibraryDatabase.return_book)"""
+        async with self._write_lock:
+            return self.db.return_book(lib_name, book_id)
+
+    def get_readable_libs_info(self) -> list[tuple[str, str, str]]:
+        """Get all libraries as tuples (name, city, address)"""
+        return self.db.get_readable_libs_info()
+
+    def get_libs_page(
+        self,
+        order_by: str | None = None,
+        offset: int = 0,
+        limit: int = DEFAULT_PAGE_SIZE,
+        descending: bool = False,
+    ) -> list[tuple[str, str, str]]:
+        """Get page of libraries (see LibraryDatabase.get_libs_page)"""
+        return self.db.get_libs_page(order_by, offset, limit, descending)
+
+    def search_libraries(
+        self, query: str, offset: int = 0, limit: int = DEFAULT_PAGE_SIZE
+    ) -> list[tuple[str, str, str]]:
+        """Full-text search (see LibraryDatabase.search_libraries)"""
+        return self.db.search_libraries(query, offset, limit)
+
+    def find_libraries(self, predicates: list[Predicate]) -> list[tuple[str, str, str]]:
+        """Query by predicates (see LibraryDatabase.find_libraries)"""
+        return self.db.find_libraries(predicates)
+
+    def get_libraries_count(self) -> int:
+        """Get total number of libraries"""
+        return self.db.get_libraries_count()
+
+    def get_city_statistics(self) -> list[tuple[str, int]]:
+        """Get libraries count per city (see LibraryDatabase.get_city_statistics)"""
+        return self.db.get_city_statistics()
+
+    def pin_snapshot(self) -> Snapshot:
+        """Get current immutable version (see LibraryDatabase.pin_snapshot)"""
+        return self.db.pin_snapshot()
+
+    async def _run_io(
+        self, function: Callable[..., _Result], *args: Any, **kwargs: Any
+    ) -> _Result:
+        """Run blocking file operation in I/O pool"""
+        async with self._io_slots:
+            return await self._run(self._io_executor, function, *args, **kwargs)
+
+    async def _run(
+        self,
+        executor: ThreadPoolExecutor,
+        function: Callable[..., _Result],
+        *args: Any,
+        **kwargs: Any,
+    ) -> _Result:
+        """Run function in executor without blocking event loop.
+        Thread can not be stopped, so on cancellation the caller still waits
+        for it to finish (writers keep the lock until data is not changed)."""
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            executor, functools.partial(function, *args, **kwargs)
+        )
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            while not future.done():
+                try:
+                    await asyncio.wait({future})
+                except asyncio.CancelledError:
+                    continue
+            if future.exception() is not None:
+                logging.warning(
+                    f"Cancelled {function.__name__} failed: {future.exception()!r}"
+                )
+            raise
@@ -0,0 +1,304 @@
+"""Books catalog logic (attached to every library)"""
+
+import logging
+
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass
+from typing import Any
+
+from logic.search_logic import SearchIndex
+
+# Default page size for listing APIs
+DEFAULT_PAGE_SIZE = 50
+
+# Constants for books data keys
+_BOOK_ID_DATA_KEY = "book_id"
+_BOOK_ISBN_DATA_KEY = "isbn"
+_BOOK_TITLE_DATA_KEY = "title"
+_BOOK_AUTHOR_DATA_KEY = "author"
+_BOOK_YEAR_DATA_KEY = "year"
+_BOOK_DESCRIPTION_DATA_KEY = "description"
+
+# Constants for book editing types
+BOOK_EDIT_TYPE_ISBN = "isbn"
+BOOK_EDIT_TYPE_TITLE = "title"
+BOOK_EDIT_TYPE_AUTHOR = "author"
+BOOK_EDIT_TYPE_YEAR = "year"
+BOOK_EDIT_TYPE_DESCRIPTION = "description"
+VALID_BOOK_EDIT_TYPES = {
+    BOOK_EDIT_TYPE_ISBN,
+    BOOK_EDIT_TYPE_TITLE,
+    BOOK_EDIT_TYPE_AUTHOR,
+    BOOK_EDIT_TYPE_YEAR,
+    BOOK_EDIT_TYPE_DESCRIPTION,
+}
+
+
+@dataclass
+class Book:
+    """Book dataclass"""
+
+    book_id: str
+    isbn: str
+    title: str
+    author: str
+    year: int
+    description: str = ""
+
+
+def normalize_isbn(isbn: str) -> str:
+    """ISBN without hyphens and spaces, 'x' check digit uppercased"""
+    return isbn.replace("-", "").replace(" ", "").upper()
+
+
+def _author_key(author: str) -> str:
+    """Case-insensitive author key for sorted index"""
+    return " ".join(author.split()).casefold()
+
+
+def _validate_year(year: Any) -> int:
+    """Year must be an integer (bool is not accepted)"""
+    if isinstance(year, bool) or not isinstance(year, int):
+        raise ValueError(f"Book year must be an integer, got {year!r}")
+    return year
+
+
+class BookCatalog:
+    """Books of one library.
+
+    Books are stored in a hash map by ID with a hash index on ISBN (several
+    copies may share one ISBN) and sorted indexes on author and year, so
+    lookups are O(1) and range queries are O(log n + page size)."""
+
+    def __init__(self) -> None:
+        self._books: dict[str, Book] = {}
+        self._isbn_index: dict[str, dict[str, None]] = {}
+        self._id_order: list[str] = []
+        self._author_index: list[tuple[str, str]] = []
+        self._year_index: list[tuple[int, str]] = []
+        self._search_index = SearchIndex()
+
+    def __len__(self) -> int:
+        return len(self._books)
+
+    def __contains__(self, book_id: object) -> bool:
+        return book_id in self._books
+
+    def add_book(
+        self,
+        book_id: str,
+        isbn: str,
+        title: str,
+        author: str,
+        year: int,
+        description: str = "",
+    ) -> Book:
+        """Register a new book in catalog."""
+        if not book_id or not isbn or not title or not author:
+            logging.warning("Not all fields filled while adding book. Raising VE...")
+            raise ValueError("All fields (ID, ISBN, title, author) must be filled.")
+        _validate_year(year)
+        if book_id in self._books:
+            raise ValueError(f"Book with ID '{book_id}' already exists")
+
+        book = Book(book_id, isbn, title, author, year, description)
+        self._books[book_id] = book
+        self._index_book(book)
+        return book
+
+    def get_book(self, book_id: str) -> Book:
+        """Get book by strict ID."""
+        try:
+            return self._books[book_id]
+        except KeyError:
+            logging.warning(f"Book '{book_id}' not found. Raising ValueError...")
+            raise ValueError(f"Book '{book_id}' not found") from None
+
+    def find_by_isbn(self, isbn: str) -> list[Book]:
+        """Get all copies with given ISBN."""
+        book_ids = self._isbn_index.get(normalize_isbn(isbn), {})
+        return [self._books[book_id] for book_id in book_ids]
+
+    def delete_book(self, book_id: str) -> Book:
+        """Delete book from catalog by strict ID.
+        Returns:
+            deleted book"""
+        book = self.get_book(book_id)
+        self._unindex_book(book)
+        del self._books[book_id]
+        return book
+
+    def edit_book(self, book_id: str, type_of_edit: str, new_value: Any) -> None:
+        """Edit book data. ID can not be edited.
+        Raises:
+            ValueError: If new value is empty or edit type is invalid
+            ValueError: If book with given ID not found
+        """
+        if type_of_edit not in VALID_BOOK_EDIT_TYPES:
+            logging.warning(
+                f"Unsupported book edit type: {type_of_edit}. Raising ValueError..."
+            )
+            raise ValueError(
+                f"Invalid edit type: {type_of_edit}. Must be one of {VALID_BOOK_EDIT_TYPES}"
+            )
+        if type_of_edit == BOOK_EDIT_TYPE_YEAR:
+            _validate_year(new_value)
+        elif type_of_edit != BOOK_EDIT_TYPE_DESCRIPTION and not new_value:
+            raise ValueError("New value must be filled.")
+
+        book = self.get_book(book_id)
+        self._unindex_book(book)
+        setattr(book, type_of_edit, new_value)
+        self._index_book(book)
+
+    def list_books(
+        self, offset: int = 0, limit: int = DEFAULT_PAGE_SIZE
+    ) -> list[Book]:
+        """Page of books ordered by ID."""
+        page = self._id_order[offset : offset + limit]
+        return [self._books[book_id] for book_id in page]
+
+    def books_by_author(
+        self, author: str, offset: int = 0, limit: int = DEFAULT_PAGE_SIZE
+    ) -> list[Book]:
+        """Page of books of one author (case-insensitive)."""
+        return self.books_by_author_range(author, author, offset, limit)
+
+    def books_by_author_range(
+        self,
+        first_author: str,
+        last_author: str,
+        offset: int = 0,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> list[Book]:
+        """Page of books with author between first and last (inclusive),
+        ordered by author."""
+        return self._range_page(
+            self._author_index,
+            _author_key(first_author),
+            _author_key(last_author),
+            offset,
+            limit,
+        )
+
+    def books_in_year_range(
+        self,
+        first_year: int,
+        last_year: int,
+        offset: int = 0,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> list[Book]:
+        """Page of books published between first and last year (inclusive),
+        ordered by year."""
+        return self._range_page(
+            self._year_index,
+            _validate_year(first_year),
+            _validate_year(last_year),
+            offset,
+            limit,
+        )
+
+    def search_books(
+        self, query: str, offset: int = 0, limit: int = DEFAULT_PAGE_SIZE
+    ) -> list[Book]:
+        """Page of books ranked by relevance of title, author and description."""
+        results = self._search_index.search(query, offset, limit)
+        return [self._books[book_id] for book_id, _ in results]  # type: ignore
+
+    def to_data(self) -> list[dict[str, Any]]:
+        """Get books data for saving to DB"""
+        # Plain dicts are built much faster than with asdict (no deep copy)
+        return [
+            {
+                _BOOK_ID_DATA_KEY: book.book_id,
+                _BOOK_ISBN_DATA_KEY: book.isbn,
+                _BOOK_TITLE_DATA_KEY: book.title,
+                _BOOK_AUTHOR_DATA_KEY: book.author,
+                _BOOK_YEAR_DATA_KEY: book.year,
+                _BOOK_DESCRIPTION_DATA_KEY: book.description,
+            }
+            for book in self._books.values()
+        ]
+
+    @classmethod
+    def from_data(cls, books_data: list[dict[str, Any]]) -> "BookCatalog":
+        """Build catalog from DB data.
+        Indexes are sorted once instead of inserting book by book.
+        Raises:
+            KeyError: If book structure is invalid
+            ValueError: If book data is invalid or IDs are duplicated
+        """
+        catalog = cls()
+        for book_data in books_data:
+            book = Book(
+                book_data[_BOOK_ID_DATA_KEY],
+                book_data[_BOOK_ISBN_DATA_KEY],
+                book_data[_BOOK_TITLE_DATA_KEY],
+                book_data[_BOOK_AUTHOR_DATA_KEY],
+                _validate_year(book_data[_BOOK_YEAR_DATA_KEY]),
+                book_data.get(_BOOK_DESCRIPTION_DATA_KEY, ""),
+            )
+            if book.book_id in catalog._books:
+                raise ValueError(f"Duplicated book ID '{book.book_id}'")
+            catalog._books[book.book_id] = book
+            catalog._isbn_index.setdefault(normalize_isbn(book.isbn), {})[
+                book.book_id
+            ] = None
+            catalog._id_order.append(book.book_id)
+            catalog._author_index.append((_author_key(book.author), book.book_id))
+            catalog._year_index.append((book.year, book.book_id))
+            catalog._index_book_text(book)
+
+        catalog._id_order.sort()
+        catalog._author_index.sort()
+        catalog._year_index.sort()
+        return catalog
+
+    def _index_book(self, book: Book) -> None:
+        """Add book to all indexes"""
+        self._isbn_index.setdefault(normalize_isbn(book.isbn), {})[book.book_id] = None
+        insort(self._id_order, book.book_id)
+        insort(self._author_index, (_author_key(book.author), book.book_id))
+        insort(self._year_index, (book.year, book.book_id))
+        self._index_book_text(book)
+
+    def _unindex_book(self, book: Book) -> None:
+        """Remove book from all indexes"""
+        isbn_key = normalize_isbn(book.isbn)
+        copies = self._isbn_index[isbn_key]
+        del copies[book.book_id]
+        if not copies:
+            del self._isbn_index[isbn_key]
+        _remove_sorted(self._id_order, book.book_id)
+        _remove_sorted(self._author_index, (_author_key(book.author), book.book_id))
+        _remove_sorted(self._year_index, (book.year, book.book_id))
+        self._search_index.remove_document(book.book_id)
+
+    def _index_book_text(self, book: Book) -> None:
+        """Add book text fields to search index"""
+        self._search_index.add_document(
+            book.book_id, book.title, book.author, book.description
+        )
+
+    def _range_page(
+        self,
+        index: list[tuple[Any, str]],
+        low: Any,
+        high: Any,
+        offset: int,
+        limit: int,
+    ) -> list[Book]:
+        """Page of books with index key in [low, high]"""
+        start = bisect_left(index, (low,))
+        # (high, ) < (high, any_id), so search for entries with key > high
+        end = bisect_right(index, (high, chr(0x10FFFF)))
+        start = min(start + offset, end)
+        stop = min(start + limit, end)
+        return [self._books[book_id] for _, book_id in index[start:stop]]
+
+
+def _remove_sorted(index: list[Any], item: Any) -> None:
+    """Remove item from sorted list in O(log n) search"""
+    position = bisect_left(index, item)
+    if position < len(index) and index[position] == item:
+        del index[position]
@@ -0,0 +1,279 @@
+"""Change data capture logic (libraries change feed for external consumers)
+
+Changes are appended to JSONL files in feed directory, one change per line
+with increasing sequence number. File is named by sequence number of its
+first change and a new file is started when current one grows too big.
+Changes are written only when DB is saved, so feed contains only persisted
+changes.
+"""
+
+import json
+import logging
+import os
+
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from logic.events_logic import (
+    DatabaseReloaded,
+    DatabaseSaved,
+    LibraryAdded,
+    LibraryDeleted,
+    LibraryEvent,
+    LibraryUpdated,
+)
+
+# Constants for change kinds
+CHANGE_ADDED = "added"
+CHANGE_UPDATED = "updated"
+CHANGE_DELETED = "deleted"
+CHANGE_RELOADED = "reloaded"  # Consumers must re-read whole DB
+
+# Constants for change data keys
+_CHANGE_SEQ_DATA_KEY = "seq"
+_CHANGE_KIND_DATA_KEY = "kind"
+_CHANGE_TIME_DATA_KEY = "time"
+_CHANGE_INFO_DATA_KEY = "library"
+_CHANGE_OLD_INFO_DATA_KEY = "old_library"
+
+_FEED_FILE_PREFIX = "changes-"
+_FEED_FILE_SUFFIX = ".jsonl"
+DEFAULT_MAX_FILE_SIZE = 4 * 1024 * 1024
+DEFAULT_MAX_FILES = 16
+
+
+class DataLossError(Exception):
+    """Requested changes are not in feed anymore (full resync is needed)"""
+
+
+@dataclass
+class Change:
+    """One change of libraries.
+    Infos are tuples (name, city, address), old_info is set for updates."""
+
+    seq: int
+    kind: str
+    time: datetime
+    info: tuple[str, str, str] | None = None
+    old_info: tuple[str, str, str] | None = None
+
+    def to_data(self) -> dict[str, Any]:
+        """Get change data for writing to feed"""
+        data: dict[str, Any] = {
+            _CHANGE_SEQ_DATA_KEY: self.seq,
+            _CHANGE_KIND_DATA_KEY: self.kind,
+            _CHANGE_TIME_DATA_KEY: self.time.isoformat(),
+        }
+        if self.info is not None:
+            data[_CHANGE_INFO_DATA_KEY] = list(self.info)
+        if self.old_info is not None:
+            data[_CHANGE_OLD_INFO_DATA_KEY] = list(self.old_info)
+        return data
+
+    @classmethod
+    def from_data(cls, data: dict[str, Any]) -> "Change":
+        """Build change from feed line data.
+        Raises:
+            KeyError: If change structure is invalid
+            ValueError: If time is invalid
+        """
+        info = data.get(_CHANGE_INFO_DATA_KEY)
+        old_info = data.get(_CHANGE_OLD_INFO_DATA_KEY)
+        return cls(
+            int(data[_CHANGE_SEQ_DATA_KEY]),
+            data[_CHANGE_KIND_DATA_KEY],
+            datetime.fromisoformat(data[_CHANGE_TIME_DATA_KEY]),
+            tuple(info) if info is not None else None,  # type: ignore
+            tuple(old_info) if old_info is not None else None,  # type: ignore
+        )
+
+
+class ChangeFeedWriter:
+    """Event listener that writes changes of LibraryDatabase to feed.
+    Subscribe it with LibraryDatabase.subscribe(). Changes are buffered and
+    written on DatabaseSaved; unsaved changes are dropped on reload.
+    Sequence numbering continues from the last change already in feed."""
+
+    def __init__(
+        self,
+        feed_dir: Path,
+        max_file_size: int = DEFAULT_MAX_FILE_SIZE,
+        max_files: int = DEFAULT_MAX_FILES,
+    ) -> None:
+        if max_file_size <= 0 or max_files < 1:
+            raise ValueError("Feed file size and files count must be positive.")
+        self._feed_dir = Path(feed_dir)
+        self._feed_dir.mkdir(parents=True, exist_ok=True)
+        self._max_file_size = max_file_size
+        self._max_files = max_files
+        self._pending: list[tuple[str, LibraryEvent, datetime]] = []
+        self.last_seq = self._recover_last_seq()
+        logging.info(f"Change feed in {self._feed_dir}, last seq {self.last_seq}")
+
+    def __call__(self, event: LibraryEvent) -> None:
+        now = datetime.now()
+        if isinstance(event, LibraryAdded):
+            self._pending.append((CHANGE_ADDED, event, now))
+        elif isinstance(event, LibraryUpdated):
+            self._pending.append((CHANGE_UPDATED, event, now))
+        elif isinstance(event, LibraryDeleted):
+            self._pending.append((CHANGE_DELETED, event, now))
+        elif isinstance(event, DatabaseReloaded):
+            if self._pending:
+                logging.warning(f"Dropping {len(self._pending)} unsaved changes")
+            self._pending = [(CHANGE_RELOADED, event, now)]
+            self.flush()  # Loaded data is already persisted
+        elif isinstance(event, DatabaseSaved):
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered changes to feed.
+        On error changes stay buffered and are written with next flush.
+        Raises:
+            OSError: If feed can not be written
+        """
+        if not self._pending:
+            return
+        changes: list[Change] = []
+        for seq, (kind, event, time) in enumerate(self._pending, self.last_seq + 1):
+            change = Change(seq, kind, time)
+            if isinstance(event, LibraryUpdated):
+                change.info, change.old_info = event.new_info, event.old_info
+            elif isinstance(event, (LibraryAdded, LibraryDeleted)):
+                change.info = event.info
+            changes.append(change)
+
+        lines = "".join(
+            json.dumps(change.to_data(), ensure_ascii=False) + "\n"
+            for change in changes
+        )
+        feed_file = self._current_file(changes[0].seq)
+        with open(feed_file, "a", encoding="utf-8") as file:
+            file.write(lines)
+            file.flush()
+            os.fsync(file.fileno())
+        self.last_seq = changes[-1].seq
+        self._pending.clear()
+        logging.debug(f"Change feed: written changes up to {self.last_seq}")
+
+    def _current_file(self, next_seq: int) -> Path:
+        """File to append changes to, rotating feed if needed"""
+        files = _feed_files(self._feed_dir)
+        if files and files[-1][1].stat().st_size < self._max_file_size:
+            return files[-1][1]
+        new_file = _feed_file_path(self._feed_dir, next_seq)
+        files.append((next_seq, new_file))
+        for _, old_file in files[: -self._max_files]:
+            logging.info(f"Change feed: removing old file {old_file}")
+            old_file.unlink(missing_ok=True)
+        return new_file
+
+    def _recover_last_seq(self) -> int:
+        """Read sequence number of last change in feed.
+        Line cut by crash is removed, so feed stays valid JSONL."""
+        files = _feed_files(self._feed_dir)
+        if not files:
+            return 0
+        first_seq, last_file = files[-1]
+        with open(last_file, "rb") as file:
+            content = file.read()
+        valid_end = content.rfind(b"\n") + 1
+        if valid_end != len(content):
+            logging.warning(f"Change feed: truncating unfinished line in {last_file}")
+            with open(last_file, "r+b") as file:
+                file.truncate(valid_end)
+        lines = content[:valid_end].splitlines()
+        if not lines:
+            return first_seq - 1
+        return Change.from_data(json.loads(lines[-1])).seq
+
+
+class ChangeFeedReader:
+    """Reads changes with sequence number greater than saved one.
+    Save last_seq after processing changes to resume from it after restart."""
+
+    def __init__(self, feed_dir: Path, last_seq: int = 0) -> None:
+        self._feed_dir = Path(feed_dir)
+        self.last_seq = last_seq
+        self._file: Path | None = None
+        self._offset = 0
+
+    def read_changes(self, limit: int | None = None) -> list[Change]:
+        """Get next changes (written by now) and advance last_seq.
+        Raises:
+            DataLossError: If changes after last_seq were already rotated away
+        """
+        changes: list[Change] = []
+        while limit is None or len(changes) < limit:
+            if (self._file is None or not self._file.exists()) and not self._locate():
+                break
+            self._read_file(changes, limit)
+            if limit is not None and len(changes) >= limit:
+                break
+            # Writer never returns to file after starting next one
+            if not self._next_file():
+                break
+        return changes
+
+    def _locate(self) -> bool:
+        """Find file containing change after last_seq.
+        Returns:
+            False if there is no feed yet
+        """
+        files = _feed_files(self._feed_dir)
+        if not files:
+            return False
+        if files[0][0] > self.last_seq + 1:
+            raise DataLossError(
+                f"Changes {self.last_seq + 1}..{files[0][0] - 1} were removed from feed"
+            )
+        self._file = max(path for seq, path in files if seq <= self.last_seq + 1)
+        self._offset = 0
+        return True
+
+    def _read_file(self, changes: list[Change], limit: int | None) -> None:
+        """Read complete lines of current file after saved offset"""
+        assert self._file is not None
+        with open(self._file, "rb") as file:
+            file.seek(self._offset)
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break  # Line is still being written
+                if limit is not None and len(changes) >= limit:
+                    break
+                self._offset += len(line)
+                change = Change.from_data(json.loads(line))
+                if change.seq > self.last_seq:
+                    changes.append(change)
+                    self.last_seq = change.seq
+
+    def _next_file(self) -> bool:
+        """Move to file after current one.
+        Returns:
+            False if current file is the last one
+        """
+        later_files = [
+            path for _, path in _feed_files(self._feed_dir) if path > self._file  # type: ignore
+        ]
+        if not later_files:
+            return False
+        self._file = later_files[0]
+        self._offset = 0
+        return True
+
+
+def _feed_file_path(feed_dir: Path, first_seq: int) -> Path:
+    """Path of feed file starting with given change"""
+    return feed_dir / f"{_FEED_FILE_PREFIX}{first_seq:012d}{_FEED_FILE_SUFFIX}"
+
+
+def _feed_files(feed_dir: Path) -> list[tuple[int, Path]]:
+    """Feed files with sequence numbers of their first changes, oldest first"""
+    files: list[tuple[int, Path]] = []
+    for path in feed_dir.glob(f"{_FEED_FILE_PREFIX}*{_FEED_FILE_SUFFIX}"):
+        seq = path.name[len(_FEED_FILE_PREFIX) : -len(_FEED_FILE_SUFFIX)]
+        if seq.isdigit():
+            files.append((int(seq), path))
+    return sorted(files)
@@ -3,12 +3,65 @@
 import os
 import json
 import hashlib
+import locale
 import logging
+import lzma
 
-from dataclasses import dataclass, asdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
 from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
 
+from logic.book_logic import BookCatalog, normalize_isbn
+from logic.cdc_logic import ChangeFeedWriter
 from logic.loading_window import LoadingWindow
+from logic.events_logic import (
+    DatabaseReloaded,
+    DatabaseSaved,
+    EventBus,
+    EventListener,
+    LibraryAdded,
+    LibraryEvent,
+    LibraryDeleted,
+    LibraryUpdated,
+)
+from logic.history_logic import (
+    DEFAULT_HISTORY_DEPTH,
+    OPERATION_ADD,
+    OPERATION_BATCH,
+    OPERATION_DELETE,
+    OPERATION_EDIT,
+    Operation,
+    OperationHistory,
+)
+from logic.loan_logic import DueIndex, Loan, LoanLedger
+from logic.mvcc_logic import (
+    Snapshot,
+    SortedView,
+    VersionedDict,
+    VersionedSortedList,
+    VersionStore,
+)
+from logic.popularity_logic import (
+    DEFAULT_POPULARITY_CAPACITY,
+    DEFAULT_TOP_SIZE,
+    PopularityTracker,
+)
+from logic.query_logic import (
+    Eq,
+    In,
+    Predicate,
+    Prefix,
+    QUERY_FIELD_ADDRESS,
+    QUERY_FIELD_CITY,
+    QUERY_FIELD_NAME,
+    VALID_QUERY_FIELDS,
+)
+from logic.replica_logic import ReplicaPublisher
+from logic.search_logic import VersionedSearchIndex, DEFAULT_PAGE_SIZE
+from logic.storage_logic import open_db_file, dump_json_streaming, load_json_streaming
+from logic.text_utils import normalize_key
 
 # Constans for password hashing
 _HASH_ALGORITHM = "sha256"
@@ -17,9 +70,15 @@ _HASH_ITERATIONS = 600_000
 # Constants for libs data keys
 _LIBRARIES_DATA_KEY = "libraries_data"
 _ADMIN_PASSWORD_DATA_KEY = "administrator_password"
+_STATISTICS_DATA_KEY = "statistics"
+_CITY_COUNTS_DATA_KEY = "city_counts"
+_POPULARITY_DATA_KEY = "popularity"
 _LIB_NAME_DATA_KEY = "name"
 _LIB_CITY_DATA_KEY = "city"
 _LIB_ADDRESS_DATA_KEY = "address"
+_LIB_BOOKS_DATA_KEY = "books"
+_LIB_LOANS_DATA_KEY = "loans"
+_LIB_POPULARITY_DATA_KEY = "popularity"
 
 # Constants for editing types
 EDIT_TYPE_NAME = "name"
@@ -27,6 +86,18 @@ EDIT_TYPE_CITY = "city"
 EDIT_TYPE_ADDRESS = "address"
 VALID_EDIT_TYPES = {EDIT_TYPE_NAME, EDIT_TYPE_CITY, EDIT_TYPE_ADDRESS}
 
+# Constants for sort orders (None means insertion order)
+SORT_BY_NAME = "name"
+SORT_BY_CITY = "city"
+SORT_BY_ADDRESS = "address"
+VALID_SORT_FIELDS = {SORT_BY_NAME, SORT_BY_CITY, SORT_BY_ADDRESS}
+
+# Character greater than any other, upper bound for prefix search
+_MAX_CHAR = chr(0x10FFFF)
+
+# Position of queried field in tuple (name, city, address)
+_INFO_FIELD_POSITIONS = {QUERY_FIELD_NAME: 0, QUERY_FIELD_CITY: 1, QUERY_FIELD_ADDRESS: 2}
+
 
 class DatabaseException(Exception):
     """Base exception for DB operations"""
@@ -51,92 +122,437 @@ class Library:
     name: str
     city: str
     address: str
+    books: BookCatalog = field(default_factory=BookCatalog, compare=False, repr=False)
+    loans: LoanLedger = field(default_factory=LoanLedger, compare=False, repr=False)
+    # Created on first borrow
+    popularity: PopularityTracker | None = field(
+        default=None, compare=False, repr=False
+    )
+    # Insertion order key, set by LibraryDatabase
+    order: int = field(default=-1, compare=False, repr=False)
+
+    def readable_info(self) -> tuple[str, str, str]:
+        """Get tuple (name, city, address)"""
+        return self.name, self.city, self.address
+
+    def to_data(self) -> dict[str, Any]:
+        """Get library data for saving to DB"""
+        data = {
+            _LIB_NAME_DATA_KEY: self.name,
+            _LIB_CITY_DATA_KEY: self.city,
+            _LIB_ADDRESS_DATA_KEY: self.address,
+            _LIB_BOOKS_DATA_KEY: self.books.to_data(),
+            _LIB_LOANS_DATA_KEY: self.loans.to_data(),
+        }
+        if self.popularity is not None:
+            data[_LIB_POPULARITY_DATA_KEY] = self.popularity.to_data()
+        return data
+
+    @classmethod
+    def from_data(
+        cls,
+        lib: dict[str, Any],
+        popularity_capacity: int = DEFAULT_POPULARITY_CAPACITY,
+    ) -> "Library":
+        """Build library from DB data.
+        Popularity is rebuilt with given capacity and keyed by normalized
+        ISBN (DBs saved before counted copies by book ID).
+        Raises:
+            KeyError: If library structure is invalid
+            TypeError: If name, city or address is not a string
+            ValueError: If books, loans or popularity data is invalid
+        """
+        name, city, address = (
+            lib[_LIB_NAME_DATA_KEY],
+            lib[_LIB_CITY_DATA_KEY],
+            lib[_LIB_ADDRESS_DATA_KEY],
+        )
+        if not all(isinstance(value, str) for value in (name, city, address)):
+            raise TypeError("Library name, city and address must be strings")
+        books = BookCatalog.from_data(lib.get(_LIB_BOOKS_DATA_KEY, []))
+        popularity = None
+        if _LIB_POPULARITY_DATA_KEY in lib:
+            popularity = PopularityTracker.from_data(
+                lib[_LIB_POPULARITY_DATA_KEY],
+                popularity_capacity,
+                lambda key: (
+                    normalize_isbn(books.get_book(key).isbn) if key in books else key
+                ),
+            )
+        return cls(
+            name,
+            city,
+            address,
+            books,
+            LoanLedger.from_data(lib.get(_LIB_LOANS_DATA_KEY, [])),
+            popularity,
+        )
+
+
+@dataclass
+class MergeReport:
+    """Changes applied by LibraryDatabase.merge_data.
+    Infos are tuples (name, city, address)"""
+
+    added: list[tuple[str, str, str]] = field(default_factory=list)
+    updated: list[tuple[str, str, str]] = field(default_factory=list)
+    deleted: list[tuple[str, str, str]] = field(default_factory=list)
+
+    def changes_count(self) -> int:
+        """Total number of changed libraries"""
+        return len(self.added) + len(self.updated) + len(self.deleted)
 
 
 class LibraryDatabase:
     """Class for database with libraries data"""
 
-    def __init__(self):
-        self._libs_data: list[Library] = []
+    def __init__(
+        self,
+        history_depth: int = DEFAULT_HISTORY_DEPTH,
+        popularity_capacity: int = DEFAULT_POPULARITY_CAPACITY,
+    ):
+        # Insertion order key -> library
+        self._libs_by_order: dict[int, Library] = {}
+        self._next_order = 0
+        self._versions = VersionStore()
+        self._history = OperationHistory(history_depth)
+        self._events = EventBus()
+        # Events of changes not published yet
+        self._pending_events: list[LibraryEvent] = []
+        self._libs_by_name: dict[str, Library] = {}
+        # Normalized keys -> library, for near-duplicates detection
+        self._name_keys: dict[str, Library] = {}
+        self._address_keys: dict[tuple[str, str], Library] = {}
+        # Indexes read by readers are versioned and frozen on every publish
+        # (see Snapshot for their entries)
+        self._insertion_order = VersionedSortedList()
+        self._sort_orders = {
+            sort_field: VersionedSortedList() for sort_field in VALID_SORT_FIELDS
+        }
+        self._prefix_orders = {
+            query_field: VersionedSortedList() for query_field in VALID_QUERY_FIELDS
+        }
+        self._value_indexes = {
+            query_field: VersionedSortedList() for query_field in VALID_QUERY_FIELDS
+        }
+        self._city_stats = VersionedDict()
+        self._search_index = VersionedSearchIndex()
+        # Open loans of all libraries by due date
+        self._due_index = DueIndex()
+        self._replica: ReplicaPublisher | None = None
+        # Most borrowed books of all libraries by ISBN, bigger capacity means
+        # more precise counts (see PopularityTracker)
+        self._popularity_capacity = popularity_capacity
+        self._popularity = PopularityTracker(popularity_capacity)
         self._admin_password: str = ""
         self.password_set: bool = bool(self._admin_password)
+        self._publish_snapshot()
 
-    def load_data(self, file_path: Path) -> None:
-        """Load data from a JSON file with a loading window."""
-        loading_window = LoadingWindow()
+    def load_data(self, file_path: Path, show_loading: bool = True) -> None:
+        """Load data from a JSON file (may be gzip/xz compressed) with a loading
+        window. File is decoded library by library, whole text is never kept
+        in memory. Data is replaced only if whole file is valid.
+        Args:
+            show_loading: False to load without loading window (no GUI)
+        """
+        loading_window = LoadingWindow() if show_loading else None
         logging.info(f"Loading DB from {file_path}")
-        self._libs_data = []
+        libs: list[Library] = []
+        try:
+            with _translate_load_errors():
+                data = self._read_file(
+                    file_path,
+                    lambda lib: libs.append(
+                        Library.from_data(lib, self._popularity_capacity)
+                    ),
+                )
+                popularity = self._popularity_from_data(data)
+        finally:
+            if loading_window:
+                loading_window.close()
+
+        # File is valid, previous data is replaced only now. Indexes are built
+        # from scratch, readers see previous version until they are published
+        self._admin_password = data[_ADMIN_PASSWORD_DATA_KEY]
+        self.password_set = bool(self._admin_password)
+        self._popularity = popularity
+        self._history.clear()
+        self._rebuild_indexes(libs)
+        self._check_saved_statistics(data.get(_STATISTICS_DATA_KEY))
+        self._pending_events.append(DatabaseReloaded())
+        self._publish_snapshot()
+        self._publish_replica()
 
+    def merge_data(self, file_path: Path, show_loading: bool = True) -> MergeReport:
+        """Update data from a JSON file changing only libraries that differ
+        (matched by name), instead of replacing everything like load_data.
+        Records equal to libraries in memory are only compared, libraries are
+        built only for new and changed ones. Changes are applied one by one
+        with usual events, so indexes are not rebuilt and open windows stay
+        valid. Nothing is changed on error.
+        Args:
+            show_loading: False to merge without loading window (no GUI)
+        Returns:
+            report with infos of added, updated and deleted libraries
+        """
+        loading_window = LoadingWindow() if show_loading else None
+        logging.info(f"Merging DB from {file_path}")
+        # Name -> library built from file / None if it is the same as in memory
+        file_libs: dict[str, Library | None] = {}
+
+        def add_file_lib(lib_data: Any) -> None:
+            lib = self._libs_by_name.get(_lib_data_name(lib_data))  # type: ignore
+            file_lib = None
+            if lib is None or not _is_same_data(lib, lib_data):
+                file_lib = Library.from_data(lib_data, self._popularity_capacity)
+                lib = file_lib
+            if lib.name in file_libs:
+                logging.warning(f"Duplicated library name '{lib.name}' in DB")
+                return
+            file_libs[lib.name] = file_lib
+
+        report = MergeReport()
         try:
-            # Load data from file
-            with open(file_path, "r", encoding="utf-8") as file:
-                data = json.load(file)
-                for lib in data[_LIBRARIES_DATA_KEY]:
-                    self._libs_data.append(
-                        Library(
-                            lib[_LIB_NAME_DATA_KEY],
-                            lib[_LIB_CITY_DATA_KEY],
-                            lib[_LIB_ADDRESS_DATA_KEY],
+            with _translate_load_errors():
+                data = self._read_file(file_path, add_file_lib)
+                popularity = self._popularity_from_data(data)
+            self._admin_password = data[_ADMIN_PASSWORD_DATA_KEY]
+            self.password_set = bool(self._admin_password)
+            self._popularity = popularity
+
+            for lib in [
+                self._libs_by_order[entry[0]]
+                for entry in self._insertion_order
+                if entry[1] not in file_libs
+            ]:
+                self._remove_library(lib)
+                report.deleted.append(lib.readable_info())
+
+            touched: list[Library] = []
+            for name, file_lib in file_libs.items():
+                if file_lib is None:
+                    continue
+                lib = self._libs_by_name.get(name)
+                if lib is None:
+                    self._insert_library(file_lib)
+                    touched.append(file_lib)
+                    report.added.append(file_lib.readable_info())
+                    continue
+                changed = False
+                for field_name in (EDIT_TYPE_CITY, EDIT_TYPE_ADDRESS):
+                    if getattr(lib, field_name) != getattr(file_lib, field_name):
+                        self._set_library_field(
+                            lib, field_name, getattr(file_lib, field_name)
                         )
-                    )
-                self._admin_password = data[_ADMIN_PASSWORD_DATA_KEY]
-                self.password_set = bool(self._admin_password)
-        except FileNotFoundError as e:
-            logging.exception("DB file not found while loading. Raising DBLoadError...")
-            loading_window.close()
-            raise DatabaseLoadError("DB file not found") from e
-        except json.JSONDecodeError as e:
-            logging.exception("JSON decoding failed. Raising DBLoadError...")
-            loading_window.close()
-            raise DatabaseLoadError("JSON decoding failed") from e
-        except KeyError as e:
-            logging.exception(
-                "Invalid DB structure. Raising InvalidDatabaseStructureError..."
-            )
-            loading_window.close()
-            raise InvalidDatabaseStructureError("Invalid DB structure error") from e
-        except Exception as e:
-            logging.exception(
-                "UNEXPECTED ERROR WHILE LOADING DB, RAISING DBLoadError..."
-            )
-            loading_window.close()
-            raise DatabaseLoadError(f"Unexpected error while loading DB\n{e}") from e
+                        changed = True
+                if lib.to_data() != file_lib.to_data():
+                    for loan in lib.loans:
+                        self._due_index.discard(loan)
+                    lib.books, lib.loans = file_lib.books, file_lib.loans
+                    for loan in lib.loans:
+                        self._due_index.add(lib, loan)
+                    lib.popularity = file_lib.popularity
+                    changed = True
+                if changed:
+                    touched.append(lib)
+                    report.updated.append(lib.readable_info())
+
+            # Libraries could swap addresses, key of moved one may be dropped
+            for lib in touched:
+                self._name_keys.setdefault(normalize_key(lib.name), lib)
+                self._address_keys.setdefault(
+                    (normalize_key(lib.city), normalize_key(lib.address)), lib
+                )
+            self._history.clear()
+            self._check_saved_statistics(data.get(_STATISTICS_DATA_KEY))
         finally:
-            loading_window.close()
+            self._publish_snapshot()
+            if loading_window:
+                loading_window.close()
+        self._publish_replica()
+        logging.info(
+            f"DB merged: {len(report.added)} added, {len(report.updated)} updated, "
+            f"{len(report.deleted)} deleted"
+        )
+        # Data in memory is the same as in file now
+        self._events.emit(DatabaseSaved())
+        return report
+
+    def _read_file(
+        self, file_path: Path, add_library: Callable[[Any], None]
+    ) -> dict[str, Any]:
+        """Read DB file passing decoded libraries data to add_library one by one.
+        Returns:
+            other values of DB (libraries list value is None)
+        Raises:
+            KeyError: If libraries list or password is missing
+        """
+        with open_db_file(file_path) as file:
+            data = load_json_streaming(
+                file,
+                {_LIBRARIES_DATA_KEY: add_library},
+            )
+        for required_key in (_LIBRARIES_DATA_KEY, _ADMIN_PASSWORD_DATA_KEY):
+            if required_key not in data:
+                raise KeyError(required_key)
+        return data
+
+    def _popularity_from_data(self, data: dict[str, Any]) -> PopularityTracker:
+        """Build global popularity from DB values (empty one if missing)
+        Raises:
+            KeyError, ValueError: If popularity data is invalid
+        """
+        if _POPULARITY_DATA_KEY not in data:
+            return PopularityTracker(self._popularity_capacity)
+        return PopularityTracker.from_data(
+            data[_POPULARITY_DATA_KEY], self._popularity_capacity
+        )
+
+    def subscribe(self, listener: EventListener) -> None:
+        """Call listener on every change of libraries (add, update, delete, reload)"""
+        self._events.subscribe(listener)
 
-    def save_data(self, file_path: Path) -> None:
-        """writes all current data to database"""
+    def unsubscribe(self, listener: EventListener) -> None:
+        """Stop notifying listener about changes"""
+        self._events.unsubscribe(listener)
+
+    def save_data(self, file_path: Path, indent: int | None = None) -> None:
+        """writes all current data to database.
+        File is compressed if its extension is .gz, .xz or .lzma. Libraries are
+        encoded one by one while writing.
+        Args:
+            indent: None (default) for compact JSON, number for pretty one
+        """
         logging.info(f"saving DB to {file_path}")
         try:
-            with open(file_path, "w") as file:
-                json.dump(
+            with open_db_file(file_path, "w") as file:
+                dump_json_streaming(
+                    file,
+                    {
+                        _LIBRARIES_DATA_KEY: (
+                            self._libs_by_order[entry[0]].to_data()
+                            for entry in self._insertion_order
+                        )
+                    },
                     {
-                        _LIBRARIES_DATA_KEY: [asdict(lib) for lib in self._libs_data],
                         _ADMIN_PASSWORD_DATA_KEY: self._admin_password,
+                        _STATISTICS_DATA_KEY: {
+                            _CITY_COUNTS_DATA_KEY: dict(self.get_city_statistics())
+                        },
+                        _POPULARITY_DATA_KEY: self._popularity.to_data(),
                     },
-                    file,
-                    indent=4,
+                    indent,
                 )
-        except OSError as e:
+        except (OSError, lzma.LZMAError) as e:
             logging.exception(f"Failed to save DB to {file_path}:")
             raise DatabaseSaveError(f"Failed to save DB to {file_path}") from e
+        self._publish_replica()
+        self._events.emit(DatabaseSaved())
+
+    def enable_change_feed(self, feed_dir: Path) -> ChangeFeedWriter:
+        """Write every saved change of libraries to sequence-numbered feed
+        (rotating JSONL files in feed_dir), so external consumers can read
+        only deltas with ChangeFeedReader.
+        Raises:
+            DatabaseException: If feed directory can not be used
+        """
+        try:
+            writer = ChangeFeedWriter(feed_dir)
+        except (OSError, KeyError, ValueError) as e:
+            logging.exception(f"Failed to open change feed in {feed_dir}:")
+            raise DatabaseException(f"Failed to open change feed in {feed_dir}") from e
+        self.subscribe(writer)
+        return writer
+
+    def enable_replica(self, name: str) -> None:
+        """Publish libraries to shared memory replica with given name, so other
+        local processes can read them with ReplicaReader instead of loading
+        the DB. Replica is republished after every load and save.
+        Raises:
+            DatabaseException: If shared memory can not be created
+        """
+        self.disable_replica()
+        try:
+            self._replica = ReplicaPublisher(name)
+        except (OSError, ValueError) as e:
+            logging.exception(f"Failed to create replica {name}:")
+            raise DatabaseException(f"Failed to create replica {name}") from e
+        self._publish_replica()
+
+    def disable_replica(self) -> None:
+        """Stop publishing and remove replica"""
+        if self._replica is not None:
+            self._replica.close()
+            self._replica = None
+
+    def _publish_replica(self) -> None:
+        """Publish current libraries if replica is enabled.
+        Failure is logged only: replica is a cache and DB itself is fine."""
+        if self._replica is None:
+            return
+        try:
+            self._replica.publish(self.get_readable_libs_info())
+        except Exception:
+            logging.exception(f"Failed to publish replica {self._replica.name}:")
 
     def add_library(self, name: str, city: str, address: str) -> None:
         """Add a new library to the database."""
         if not name or not city or not address:
             logging.warning("Not all fields filled while adding lb. Raising VE...")
             raise ValueError("All fields (name, city, address) must be filled.")
-        for lib in self._libs_data:
-            if lib.name == name:
-                raise ValueError(
-                    f"Library with name '{name}' already exists in city {lib.city}, on {lib.address}"
-                )
-            if address == lib.address and city == lib.city:
+        self._check_name_free(name)
+        self._check_address_free(city, address)
+
+        lib = Library(name, city, address)
+        self._commit(self._insert_library(lib))
+
+    def add_libraries(self, libs_info: list[tuple[str, str, str]]) -> None:
+        """Add many libraries at once (bulk import).
+        Nothing is added if any library is invalid or duplicated.
+        Args:
+            libs_info: list of tuples (name, city, address)
+        Raises:
+            ValueError: If any field is empty or library is duplicated
+        """
+        name_keys: set[str] = set()
+        address_keys: set[tuple[str, str]] = set()
+        for name, city, address in libs_info:
+            if not name or not city or not address:
+                logging.warning("Not all fields filled in bulk import. Raising VE...")
+                raise ValueError("All fields (name, city, address) must be filled.")
+            self._check_name_free(name)
+            self._check_address_free(city, address)
+
+            name_key = normalize_key(name)
+            address_key = (normalize_key(city), normalize_key(address))
+            if name_key in name_keys:
+                raise ValueError(f"Library with name '{name}' is duplicated in import")
+            if address_key in address_keys:
                 raise ValueError(
-                    f"Library with address '{address}' already exists in city {lib.city}, with name {lib.name}"
+                    f"Library with address '{address}' in city {city} is duplicated in import"
                 )
+            name_keys.add(name_key)
+            address_keys.add(address_key)
 
-        self._libs_data.append(Library(name, city, address))
+        parts = [
+            self._insert_library(Library(name, city, address))
+            for name, city, address in libs_info
+        ]
+        self._commit(
+            Operation(OPERATION_BATCH, f"import {len(parts)} libraries", parts=parts)
+        )
+
+    def search_libraries(
+        self, query: str, offset: int = 0, limit: int = DEFAULT_PAGE_SIZE
+    ) -> list[tuple[str, str, str]]:
+        """Full-text search by name, city and address (BM25 ranking).
+        Returns:
+            page of tuples (name, city, address), best match first
+        """
+        search_index = self._versions.pin().search_index
+        if search_index is None:
+            return []
+        return [info for info, _ in search_index.search(query, offset, limit)]  # type: ignore
 
     def get_readable_libs_info(self) -> list[tuple[str, str, str]]:
         """Get readable info of all libraries
@@ -144,18 +560,434 @@ class LibraryDatabase:
             list of tuples (name, city, address)
         """
         logging.debug("AdminMainWindow: called get_readable_libs_info")
-        libs_info: list[tuple[str, str, str]] = []
-
-        for lib in self._libs_data:
-            libs_info.append(
-                (
-                    lib.name,
-                    lib.city,
-                    lib.address,
+        return [entry[1:] for entry in self._versions.pin().libraries]
+
+    def pin_snapshot(self) -> Snapshot:
+        """Get consistent immutable version of libraries and their indexes
+        without locking. All read methods use the current one. Writers
+        publish new version after each finished operation (and after load),
+        pinned one stays the same until reader drops it."""
+        return self._versions.pin()
+
+    def get_libs_page(
+        self,
+        order_by: str | None = None,
+        offset: int = 0,
+        limit: int = DEFAULT_PAGE_SIZE,
+        descending: bool = False,
+    ) -> list[tuple[str, str, str]]:
+        """Get page of libraries in insertion order or sorted by field.
+        Sort orders are maintained on every change, so page costs
+        O(log N + limit).
+        Args:
+            order_by: None, 'name', 'city' or 'address'
+        Returns:
+            list of tuples (name, city, address)
+        Raises:
+            ValueError: If order_by is not a valid sort field
+        """
+        if offset < 0 or limit <= 0:
+            return []
+        snapshot = self._versions.pin()
+        if order_by is None:
+            libs = snapshot.libraries
+        elif order_by in VALID_SORT_FIELDS:
+            libs = snapshot.sort_orders[order_by]
+        else:
+            logging.warning(f"Unsupported sort field: {order_by}. Raising VE...")
+            raise ValueError(
+                f"Invalid sort field: {order_by}. Must be one of {VALID_SORT_FIELDS}"
+            )
+
+        if descending:
+            stop = len(libs) - offset
+            page = libs[max(stop - limit, 0) : max(stop, 0)][::-1]
+        else:
+            page = libs[offset : offset + limit]
+        return [entry[1:] for entry in page]
+
+    def get_libraries_count(self) -> int:
+        """Get total number of libraries"""
+        return len(self._versions.pin())
+
+    def get_city_statistics(self) -> list[tuple[str, int]]:
+        """Get libraries count per city (cities with same normalized name are
+        counted together), biggest first. Costs O(cities), counters are kept
+        up to date on every change.
+        Returns:
+            list of tuples (city, libraries count)
+        """
+        return _sorted_city_stats(self._versions.pin().city_stats.values())
+
+    def get_library_books(self, lib_name: str) -> BookCatalog:
+        """Get books catalog of library by strict name.
+        Raises:
+            ValueError: If library with given name not found
+        """
+        return self._get_library(lib_name).books
+
+    def borrow_book(
+        self,
+        lib_name: str,
+        book_id: str,
+        client: str,
+        due_at: datetime,
+        borrowed_at: datetime | None = None,
+    ) -> Loan:
+        """Borrow book from library.
+        Raises:
+            ValueError: If library or book not found
+            ValueError: If book is already borrowed
+        """
+        lib = self._get_library(lib_name)
+        book = lib.books.get_book(book_id)
+        loan = lib.loans.borrow(book_id, client, due_at, borrowed_at)
+        self._due_index.add(lib, loan)
+        # Copies of one title are counted together
+        isbn = normalize_isbn(book.isbn)
+        if lib.popularity is None:
+            lib.popularity = PopularityTracker(self._popularity_capacity)
+        lib.popularity.add(isbn)
+        self._popularity.add(isbn)
+        return loan
+
+    def return_book(self, lib_name: str, book_id: str) -> Loan:
+        """Return borrowed book to library.
+        Raises:
+            ValueError: If library not found or book is not borrowed
+        """
+        loan = self._get_library(lib_name).loans.return_book(book_id)
+        self._due_index.discard(loan)
+        return loan
+
+    def get_popular_books(
+        self, lib_name: str, k: int = DEFAULT_TOP_SIZE
+    ) -> list[tuple[str, int]]:
+        """Get most borrowed books of library by ISBN (copies of one title are
+        counted together), O(k).
+        Counts are estimated (see PopularityTracker).
+        Returns:
+            list of tuples (normalized ISBN, borrows count), most borrowed first
+        Raises:
+            ValueError: If library not found
+        """
+        popularity = self._get_library(lib_name).popularity
+        return popularity.top(k) if popularity else []
+
+    def get_popular_isbns(self, k: int = DEFAULT_TOP_SIZE) -> list[tuple[str, int]]:
+        """Get most borrowed books of all libraries by ISBN, O(k).
+        Returns:
+            list of tuples (normalized ISBN, borrows count), most borrowed first
+        """
+        return self._popularity.top(k)
+
+    def get_client_loans(self, lib_name: str, client: str) -> list[Loan]:
+        """Get open loans of client in library"""
+        return self._get_library(lib_name).loans.client_loans(client)
+
+    def get_overdue_loans(
+        self, now: datetime | None = None, limit: int | None = None
+    ) -> list[tuple[str, Loan]]:
+        """Get overdue loans of all libraries, most overdue first.
+        Loans of all libraries share one due index, so limit loans cost
+        O(limit log limit) however many libraries there are.
+        Returns:
+            list of tuples (library name, loan)
+        """
+        result: list[tuple[str, Loan]] = []
+        for lib, loan in self._due_index.overdue(now):
+            if limit is not None and len(result) >= limit:
+                break
+            result.append((lib.name, loan))
+        return result
+
+    def find_libraries(self, predicates: list[Predicate]) -> list[tuple[str, str, str]]:
+        """Find libraries matching all predicates (Eq, Prefix, In).
+        Most selective predicate is answered by index, others only filter
+        its candidates, so whole DB is never scanned.
+        Returns:
+            list of tuples (name, city, address) sorted by name
+        """
+        return self._query(predicates, self._versions.pin())
+
+    def update_where(
+        self, predicates: list[Predicate], type_of_edit: str, new_value: str
+    ) -> int:
+        """Set name, city or address of all libraries matching predicates.
+        Everything is checked before first change, so either all libraries are
+        updated or none; update is undone as one operation.
+        Returns:
+            number of updated libraries
+        Raises:
+            ValueError: If no predicates given or new value is empty
+            ValueError: If type_of_edit is not 'name', 'city' or 'address'
+            ValueError: If updated library would duplicate another one
+        """
+        if not predicates:
+            raise ValueError("At least one predicate is required.")
+        if not type_of_edit or not new_value:
+            logging.warning("Empty parameters in bulk update. Raising ValueError...")
+            raise ValueError("Edit type and new value must be filled.")
+        if type_of_edit not in VALID_EDIT_TYPES:
+            logging.warning(
+                f"Unsupported edit type: {type_of_edit}. Raising ValueError..."
+            )
+            raise ValueError(
+                f"Invalid edit type: {type_of_edit}. Must be one of {VALID_EDIT_TYPES}"
+            )
+        libs = self._query_libraries(predicates)
+
+        if type_of_edit == EDIT_TYPE_NAME:
+            if len(libs) > 1:
+                raise ValueError(
+                    f"{len(libs)} libraries can not get the same name '{new_value}'"
                 )
+            for lib in libs:
+                self._check_name_free(new_value, lib)
+        else:
+            matched_ids = {id(lib) for lib in libs}
+            new_address_keys: set[tuple[str, str]] = set()
+            for lib in libs:
+                city, address = lib.city, lib.address
+                if type_of_edit == EDIT_TYPE_CITY:
+                    city = new_value
+                else:
+                    address = new_value
+                address_key = (normalize_key(city), normalize_key(address))
+                other = self._address_keys.get(address_key)
+                if address_key in new_address_keys or (
+                    other is not None and id(other) not in matched_ids
+                ):
+                    raise ValueError(
+                        f"Library with address '{address}' would be duplicated in city {city}"
+                    )
+                new_address_keys.add(address_key)
+
+        if not libs:
+            return 0
+        parts = [
+            self._set_library_field(lib, type_of_edit, new_value) for lib in libs
+        ]
+        self._commit(
+            Operation(
+                OPERATION_BATCH,
+                f"edit {type_of_edit} of {len(parts)} libraries",
+                parts=parts,
+            )
+        )
+        return len(parts)
+
+    def delete_where(self, predicates: list[Predicate]) -> int:
+        """Delete all libraries matching predicates (undone as one operation).
+        Returns:
+            number of deleted libraries
+        Raises:
+            ValueError: If no predicates given
+        """
+        if not predicates:
+            raise ValueError("At least one predicate is required.")
+        libs = self._query_libraries(predicates)
+        if not libs:
+            return 0
+        parts = [self._remove_library(lib) for lib in libs]
+        self._commit(
+            Operation(OPERATION_BATCH, f"delete {len(parts)} libraries", parts=parts)
+        )
+        return len(parts)
+
+    def _query(
+        self, predicates: list[Predicate], snapshot: Snapshot
+    ) -> list[tuple[str, str, str]]:
+        """Get infos of libraries in snapshot matching all predicates sorted by
+        name"""
+        if not predicates:
+            infos = [entry[1:] for entry in snapshot.libraries]
+        else:
+            # Index with smallest result is used, ranges are found in O(log N)
+            ranges = [
+                _predicate_ranges(snapshot, predicate) for predicate in predicates
+            ]
+            sizes = [sum(stop - start for _, start, stop in found) for found in ranges]
+            best = sizes.index(min(sizes))
+            rest = predicates[:best] + predicates[best + 1 :]
+            infos = [
+                info
+                for view, start, stop in ranges[best]
+                for info in (entry[1:] for entry in view[start:stop])
+                if all(
+                    predicate.matches(info[_INFO_FIELD_POSITIONS[predicate.field_name]])
+                    for predicate in rest
+                )
+            ]
+        infos.sort(key=lambda info: _collation_key(info[0]))
+        return infos
+
+    def _query_libraries(self, predicates: list[Predicate]) -> list[Library]:
+        """Get libraries matching all predicates sorted by name.
+        Writer publishes every finished operation, so current version is its
+        own data."""
+        return [
+            self._libs_by_name[name]
+            for name, _, _ in self._query(predicates, self._versions.pin())
+        ]
+
+    def _get_library(self, lib_name: str) -> Library:
+        """Get library by strict name.
+        Raises:
+            ValueError: If library with given name not found
+        """
+        lib = self._libs_by_name.get(lib_name)
+        if lib is None:
+            logging.warning("Invalid lib name. Raising ValueError...")
+            raise ValueError(f"Library '{lib_name}' not found")
+        return lib
+
+    def _check_name_free(
+        self, name: str, ignored_lib: Library | None = None
+    ) -> None:
+        """Check that no other library has same (normalized) name.
+        Raises:
+            ValueError: If name is taken
+        """
+        lib = self._name_keys.get(normalize_key(name))
+        if lib is not None and lib is not ignored_lib:
+            raise ValueError(
+                f"Library with name '{lib.name}' already exists in city {lib.city}, on {lib.address}"
+            )
+
+    def _check_address_free(
+        self, city: str, address: str, ignored_lib: Library | None = None
+    ) -> None:
+        """Check that no other library has same (normalized) city and address.
+        Raises:
+            ValueError: If address is taken
+        """
+        lib = self._address_keys.get((normalize_key(city), normalize_key(address)))
+        if lib is not None and lib is not ignored_lib:
+            raise ValueError(
+                f"Library with address '{lib.address}' already exists in city {lib.city}, with name {lib.name}"
             )
 
-        return libs_info
+    def _index_library(self, lib: Library) -> None:
+        """Add library to lookup, duplicate detection, sort, query and search
+        indexes"""
+        keys = _library_keys(lib)
+        self._index_lookups(lib, keys)
+        info = lib.readable_info()
+        self._insertion_order.add((lib.order, *info))
+        for sort_field, sort_order in self._sort_orders.items():
+            sort_order.add(_sort_entry(lib, sort_field))
+        for query_field, prefix_order in self._prefix_orders.items():
+            prefix_order.add(_prefix_entry(lib, query_field))
+        for query_field, value_index in self._value_indexes.items():
+            value_index.add(_value_entry(lib, keys, query_field))
+        self._search_index.add_document(info, *info)
+        city_key = keys[QUERY_FIELD_CITY]
+        city, count = self._city_stats.get(city_key, (lib.city, 0))
+        self._city_stats.set(city_key, (city, count + 1))
+
+    def _unindex_library(self, lib: Library) -> None:
+        """Remove library from lookup, duplicate detection, sort, query and
+        search indexes"""
+        if self._libs_by_name.get(lib.name) is lib:
+            del self._libs_by_name[lib.name]
+        keys = _library_keys(lib)
+        name_key = keys[QUERY_FIELD_NAME]
+        if self._name_keys.get(name_key) is lib:
+            del self._name_keys[name_key]
+        address_key = (keys[QUERY_FIELD_CITY], keys[QUERY_FIELD_ADDRESS])
+        if self._address_keys.get(address_key) is lib:
+            del self._address_keys[address_key]
+        info = lib.readable_info()
+        self._insertion_order.remove((lib.order, *info))
+        for sort_field, sort_order in self._sort_orders.items():
+            sort_order.remove(_sort_entry(lib, sort_field))
+        for query_field, prefix_order in self._prefix_orders.items():
+            prefix_order.remove(_prefix_entry(lib, query_field))
+        for query_field, value_index in self._value_indexes.items():
+            value_index.remove(_value_entry(lib, keys, query_field))
+        self._search_index.remove_document(info, *info)
+        city_key = keys[QUERY_FIELD_CITY]
+        city, count = self._city_stats.get(city_key)
+        if count > 1:
+            self._city_stats.set(city_key, (city, count - 1))
+        else:
+            self._city_stats.discard(city_key)
+
+    def _index_lookups(self, lib: Library, keys: dict[str, str]) -> None:
+        """Add library to lookup by name and duplicate detection.
+        Args:
+            keys: normalized fields of library (see _library_keys)
+        """
+        self._libs_by_name[lib.name] = lib
+        self._name_keys.setdefault(keys[QUERY_FIELD_NAME], lib)
+        self._address_keys.setdefault(
+            (keys[QUERY_FIELD_CITY], keys[QUERY_FIELD_ADDRESS]), lib
+        )
+
+    def _rebuild_indexes(self, libs: list[Library]) -> None:
+        """Replace libraries and build all indexes from scratch (after loading).
+        Readers keep using published version until next publish."""
+        self._libs_by_order = {}
+        self._libs_by_name = {}
+        self._name_keys = {}
+        self._address_keys = {}
+        city_counts: dict[str, list[Any]] = {}
+        # Normalizing is the slowest part of indexing, it is done once
+        libs_keys = [_library_keys(lib) for lib in libs]
+        for order, (lib, keys) in enumerate(zip(libs, libs_keys)):
+            lib.order = order
+            self._libs_by_order[order] = lib
+            if keys[QUERY_FIELD_NAME] in self._name_keys:
+                logging.warning(f"Duplicated library name '{lib.name}' in DB")
+            self._index_lookups(lib, keys)
+            city_counts.setdefault(keys[QUERY_FIELD_CITY], [lib.city, 0])[1] += 1
+        self._next_order = len(libs)
+        self._due_index.rebuild((lib, loan) for lib in libs for loan in lib.loans)
+
+        # Sorting once is much faster than inserting one by one
+        self._insertion_order = VersionedSortedList(
+            (lib.order, *lib.readable_info()) for lib in libs
+        )
+        self._sort_orders = {
+            sort_field: VersionedSortedList(_sort_entry(lib, sort_field) for lib in libs)
+            for sort_field in VALID_SORT_FIELDS
+        }
+        self._prefix_orders = {
+            query_field: VersionedSortedList(
+                _prefix_entry(lib, query_field) for lib in libs
+            )
+            for query_field in VALID_QUERY_FIELDS
+        }
+        self._value_indexes = {
+            query_field: VersionedSortedList(
+                _value_entry(lib, keys, query_field)
+                for lib, keys in zip(libs, libs_keys)
+            )
+            for query_field in VALID_QUERY_FIELDS
+        }
+        self._search_index = VersionedSearchIndex(
+            (lib.readable_info(), *lib.readable_info()) for lib in libs
+        )
+        self._city_stats = VersionedDict()
+        for city_key, (city, count) in city_counts.items():
+            self._city_stats.set(city_key, (city, count))
+
+    def _check_saved_statistics(self, saved_statistics: Any) -> None:
+        """Compare statistics saved in DB with counted on load.
+        Mismatch means DB was edited manually, counted ones are used.
+        Cities are compared by normalized name, displayed one depends on
+        which library of city came first."""
+        if not isinstance(saved_statistics, dict):
+            return
+        saved_counts = saved_statistics.get(_CITY_COUNTS_DATA_KEY)
+        if not isinstance(saved_counts, dict):
+            logging.warning("Saved statistics are outdated, using recounted ones")
+            return
+        saved = {normalize_key(city): count for city, count in saved_counts.items()}
+        counted = {normalize_key(city): count for city, count in self._city_stats.values()}
+        if len(saved) != len(saved_counts) or saved != counted:
+            logging.warning("Saved statistics are outdated, using recounted ones")
 
     def update_admin_password(self, new_password: str) -> None:
         """Hash and update the administrator password."""
@@ -193,11 +1025,10 @@ class LibraryDatabase:
 
         Parameters:
         library_name (str): Library name."""
-        for lib in self._libs_data:
-            if lib.name == library_name:
-                self._libs_data.remove(lib)
-                return
-        raise DatabaseException("Library not found when deleting!")
+        lib = self._libs_by_name.get(library_name)
+        if lib is None:
+            raise DatabaseException("Library not found when deleting!")
+        self._commit(self._remove_library(lib))
 
     def edit_library_data(
         self, lib_name: str, type_of_edit: str, new_value: str
@@ -225,31 +1056,271 @@ class LibraryDatabase:
             raise ValueError(
                 f"Invalid edit type: {type_of_edit}. Must be one of {VALID_EDIT_TYPES}"
             )
-        for lib in self._libs_data:
-            if lib.name == lib_name:
-                if type_of_edit == EDIT_TYPE_NAME:
-                    for other_lib in self._libs_data:
-                        if other_lib is not lib and other_lib.name == new_value:
-                            raise ValueError(
-                                f"Another library with name '{new_value}' already exists."
-                            )
-                    lib.name = new_value        
-                    break
-                if type_of_edit == EDIT_TYPE_CITY:
-                    lib.city = new_value
-                    break
-                if type_of_edit == EDIT_TYPE_ADDRESS:
-                    for other_lib in self._libs_data:
-                        if (
-                            other_lib is not lib
-                            and other_lib.address == new_value
-                            and other_lib.city == lib.city
-                        ):
-                            raise ValueError(
-                                f"Another library with address '{new_value}' already exists in the same city {lib.city}"
-                            )
-                    lib.address = new_value
-                    break
-        else:
+        try:
+            lib = self._get_library(lib_name)
+        except ValueError:
             logging.warning("Invalid lib name while editing. Raising ValueError...")
-            raise ValueError(f"Library '{lib_name}' not found")
+            raise
+
+        if type_of_edit == EDIT_TYPE_NAME:
+            self._check_name_free(new_value, lib)
+        elif type_of_edit == EDIT_TYPE_CITY:
+            self._check_address_free(new_value, lib.address, lib)
+        elif type_of_edit == EDIT_TYPE_ADDRESS:
+            self._check_address_free(lib.city, new_value, lib)
+
+        self._commit(self._set_library_field(lib, type_of_edit, new_value))
+
+    def can_undo(self) -> bool:
+        """Is there an operation to undo"""
+        return self._history.can_undo()
+
+    def can_redo(self) -> bool:
+        """Is there an undone operation to redo"""
+        return self._history.can_redo()
+
+    def undo(self) -> Operation:
+        """Revert last operation (add, delete, edit or import).
+        Returns:
+            undone operation
+        Raises:
+            DatabaseException: If there is nothing to undo
+        """
+        if not self._history.can_undo():
+            raise DatabaseException("Nothing to undo")
+        operation = self._history.pop_undo()
+        logging.info(f"Undoing {operation.description}")
+        self._revert_operation(operation)
+        self._publish_snapshot()
+        return operation
+
+    def redo(self) -> Operation:
+        """Repeat last undone operation.
+        Returns:
+            redone operation
+        Raises:
+            DatabaseException: If there is nothing to redo
+        """
+        if not self._history.can_redo():
+            raise DatabaseException("Nothing to redo")
+        operation = self._history.pop_redo()
+        logging.info(f"Redoing {operation.description}")
+        self._apply_operation(operation)
+        self._publish_snapshot()
+        return operation
+
+    def _commit(self, operation: Operation) -> None:
+        """Record finished operation and publish its result to readers"""
+        self._history.record(operation)
+        self._publish_snapshot()
+
+    def _publish_snapshot(self) -> None:
+        """Publish current libraries and indexes as new version, then emit
+        events of published changes.
+        Only chunks changed since previous version are new, others are shared,
+        so it costs O(N / chunk size) references."""
+        self._versions.publish(
+            Snapshot(
+                0,
+                self._insertion_order.freeze(),
+                _freeze_all(self._sort_orders),
+                _freeze_all(self._prefix_orders),
+                _freeze_all(self._value_indexes),
+                self._search_index.freeze(),
+                self._city_stats.freeze(),
+            )
+        )
+        events, self._pending_events = self._pending_events, []
+        for event in events:
+            self._events.emit(event)
+
+    def _insert_library(self, lib: Library, order: int | None = None) -> Operation:
+        """Insert library (to the end by default) and index it.
+        Args:
+            order: insertion order key (of deleted library when undoing)
+        Returns:
+            operation for history"""
+        if order is None:
+            order = self._next_order
+        self._next_order = max(self._next_order, order + 1)
+        lib.order = order
+        self._libs_by_order[order] = lib
+        self._index_library(lib)
+        for loan in lib.loans:
+            self._due_index.add(lib, loan)
+        self._pending_events.append(LibraryAdded(lib.readable_info()))
+        return Operation(OPERATION_ADD, f"add library '{lib.name}'", lib, order)
+
+    def _remove_library(self, lib: Library) -> Operation:
+        """Remove library and unindex it.
+        Returns:
+            operation for history"""
+        del self._libs_by_order[lib.order]
+        self._unindex_library(lib)
+        for loan in lib.loans:
+            self._due_index.discard(loan)
+        self._pending_events.append(LibraryDeleted(lib.readable_info()))
+        return Operation(
+            OPERATION_DELETE, f"delete library '{lib.name}'", lib, lib.order
+        )
+
+    def _set_library_field(
+        self, lib: Library, field_name: str, value: str
+    ) -> Operation:
+        """Set name, city or address of library and reindex it (insertion
+        order key stays the same).
+        Returns:
+            operation for history"""
+        old_value = getattr(lib, field_name)
+        old_info = lib.readable_info()
+        self._unindex_library(lib)
+        setattr(lib, field_name, value)
+        self._index_library(lib)
+        self._pending_events.append(LibraryUpdated(old_info, lib.readable_info()))
+        return Operation(
+            OPERATION_EDIT,
+            f"edit {field_name} of library '{lib.name}'",
+            lib,
+            field_name=field_name,
+            old_value=old_value,
+            new_value=value,
+        )
+
+    def _apply_operation(self, operation: Operation) -> None:
+        """Apply recorded operation again"""
+        if operation.kind == OPERATION_ADD:
+            self._insert_library(operation.target, operation.position)
+        elif operation.kind == OPERATION_DELETE:
+            self._remove_library(operation.target)
+        elif operation.kind == OPERATION_EDIT:
+            self._set_library_field(
+                operation.target, operation.field_name, operation.new_value
+            )
+        elif operation.kind == OPERATION_BATCH:
+            for part in operation.parts:
+                self._apply_operation(part)
+
+    def _revert_operation(self, operation: Operation) -> None:
+        """Apply inverse of recorded operation"""
+        if operation.kind == OPERATION_ADD:
+            self._remove_library(operation.target)
+        elif operation.kind == OPERATION_DELETE:
+            self._insert_library(operation.target, operation.position)
+        elif operation.kind == OPERATION_EDIT:
+            self._set_library_field(
+                operation.target, operation.field_name, operation.old_value
+            )
+        elif operation.kind == OPERATION_BATCH:
+            for part in reversed(operation.parts):
+                self._revert_operation(part)
+
+
+@contextmanager
+def _translate_load_errors() -> Iterator[None]:
+    """Turn errors of reading DB file into DatabaseLoadError or
+    InvalidDatabaseStructureError"""
+    try:
+        yield
+    except FileNotFoundError as e:
+        logging.exception("DB file not found while loading. Raising DBLoadError...")
+        raise DatabaseLoadError("DB file not found") from e
+    except json.JSONDecodeError as e:
+        logging.exception("JSON decoding failed. Raising DBLoadError...")
+        raise DatabaseLoadError("JSON decoding failed") from e
+    except (KeyError, ValueError, TypeError) as e:
+        logging.exception(
+            "Invalid DB structure. Raising InvalidDatabaseStructureError..."
+        )
+        raise InvalidDatabaseStructureError("Invalid DB structure error") from e
+    except (OSError, EOFError, lzma.LZMAError) as e:
+        logging.exception("Failed to read DB file. Raising DBLoadError...")
+        raise DatabaseLoadError(f"Failed to read DB file\n{e}") from e
+    except Exception as e:
+        logging.exception(
+            "UNEXPECTED ERROR WHILE LOADING DB, RAISING DBLoadError..."
+        )
+        raise DatabaseLoadError(f"Unexpected error while loading DB\n{e}") from e
+
+
+def _lib_data_name(lib_data: Any) -> str | None:
+    """Name from library data / None if data has no valid name"""
+    if not isinstance(lib_data, dict):
+        return None
+    name = lib_data.get(_LIB_NAME_DATA_KEY)
+    return name if isinstance(name, str) else None
+
+
+def _is_same_data(lib: Library, lib_data: dict[str, Any]) -> bool:
+    """Is library data from file exactly the same as library in memory"""
+    return lib.to_data() == {
+        _LIB_BOOKS_DATA_KEY: [],
+        _LIB_LOANS_DATA_KEY: [],
+        **lib_data,
+    }
+
+
+def _freeze_all(
+    versioned_lists: dict[str, VersionedSortedList]
+) -> dict[str, SortedView]:
+    """Freeze every list of dict"""
+    return {key: versioned.freeze() for key, versioned in versioned_lists.items()}
+
+
+def _sorted_city_stats(city_stats: Iterable[tuple[str, int]]) -> list[tuple[str, int]]:
+    """City statistics, biggest first"""
+    return sorted(city_stats, key=lambda item: (-item[1], item[0]))
+
+
+def _collation_key(value: str) -> tuple[str, str]:
+    """Key of locale-aware case-insensitive sorting"""
+    return locale.strxfrm(value.casefold()), value
+
+
+def _sort_entry(lib: Library, sort_field: str) -> tuple[str, ...]:
+    """Sort order entry: (locale collation key of field, name, city, address)"""
+    return locale.strxfrm(getattr(lib, sort_field).casefold()), *lib.readable_info()
+
+
+def _prefix_entry(lib: Library, query_field: str) -> tuple[str, ...]:
+    """Prefix order entry: (casefolded field, name, city, address)"""
+    return getattr(lib, query_field).casefold(), *lib.readable_info()
+
+
+def _library_keys(lib: Library) -> dict[str, str]:
+    """Normalized name, city and address of library by query field"""
+    return {
+        query_field: normalize_key(getattr(lib, query_field))
+        for query_field in VALID_QUERY_FIELDS
+    }
+
+
+def _value_entry(
+    lib: Library, keys: dict[str, str], query_field: str
+) -> tuple[str, ...]:
+    """Value index entry: (normalized field, name, city, address)"""
+    return keys[query_field], *lib.readable_info()
+
+
+def _predicate_ranges(
+    snapshot: Snapshot, predicate: Predicate
+) -> list[tuple[SortedView, int, int]]:
+    """Slices (view, start, stop) of snapshot indexes with entries matching
+    predicate, O(log N) each.
+    Raises:
+        ValueError: If predicate is not Eq, In or Prefix
+    """
+    if isinstance(predicate, Prefix):
+        view = snapshot.prefix_orders[predicate.field_name]
+        prefix = predicate.prefix.casefold()
+        bounds = [(prefix, prefix + _MAX_CHAR)]
+    elif isinstance(predicate, (Eq, In)):
+        view = snapshot.value_indexes[predicate.field_name]
+        keys = [predicate.key] if isinstance(predicate, Eq) else sorted(predicate.keys)
+        # Key followed by "\0" is bigger than key and smaller than longer ones
+        bounds = [(key, key + "\0") for key in keys]
+    else:
+        raise ValueError(f"Unsupported predicate: {predicate}")
+    return [
+        (view, view.bisect_left((lower,)), view.bisect_left((upper,)))
+        for lower, upper in bounds
+    ]
@@ -0,0 +1,76 @@
+"""Change notifications logic (observer for LibraryDatabase)"""
+
+import logging
+
+from dataclasses import dataclass
+from typing import Callable
+
+
+@dataclass(frozen=True)
+class LibraryEvent:
+    """Base class for libraries change events"""
+
+
+@dataclass(frozen=True)
+class LibraryAdded(LibraryEvent):
+    """Library was added.
+    info is tuple (name, city, address)"""
+
+    info: tuple[str, str, str]
+
+
+@dataclass(frozen=True)
+class LibraryUpdated(LibraryEvent):
+    """Library name, city or address was changed.
+    Infos are tuples (name, city, address)"""
+
+    old_info: tuple[str, str, str]
+    new_info: tuple[str, str, str]
+
+
+@dataclass(frozen=True)
+class LibraryDeleted(LibraryEvent):
+    """Library was deleted.
+    info is tuple (name, city, address)"""
+
+    info: tuple[str, str, str]
+
+
+@dataclass(frozen=True)
+class DatabaseReloaded(LibraryEvent):
+    """All data was replaced (loaded from file).
+    Not emitted if loading failed, data is not changed then."""
+
+
+@dataclass(frozen=True)
+class DatabaseSaved(LibraryEvent):
+    """All changes were successfully written to file"""
+
+
+EventListener = Callable[[LibraryEvent], None]
+
+
+class EventBus:
+    """Synchronous events dispatcher.
+    Failing listener is logged and does not break other listeners."""
+
+    def __init__(self) -> None:
+        self._listeners: list[EventListener] = []
+
+    def subscribe(self, listener: EventListener) -> None:
+        """Call listener on every event"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener: EventListener) -> None:
+        """Stop calling listener (nothing happens if it is not subscribed)"""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def emit(self, event: LibraryEvent) -> None:
+        """Pass event to all listeners"""
+        for listener in list(self._listeners):
+            try:
+                listener(event)
+            except Exception:
+                logging.exception(f"Event listener {listener} failed on {event}")
@@ -2,6 +2,7 @@
 
 import logging
 from abc import ABC, abstractmethod
+from typing import Callable
 import tkinter as tk
 import webbrowser as web
 from tkinter import ttk
@@ -14,24 +15,40 @@ from logic.db_logic import (
     EDIT_TYPE_NAME,
     EDIT_TYPE_CITY,
     EDIT_TYPE_ADDRESS,
-    VALID_EDIT_TYPES
+    VALID_EDIT_TYPES,
+    SORT_BY_NAME,
+    SORT_BY_CITY,
+    SORT_BY_ADDRESS,
 )
-from logic.gui_utils import center_window
+from logic.history_logic import Operation
+from logic.profiling_logic import SessionProfiler
+from logic.events_logic import LibraryEvent
+from logic.gui_utils import center_window, get_root, load_image, IdleBatcher
 from config import DB_PATH, ICON_PATH
 
+LIST_PAGE_SIZE = 50
 
-class AdminMainWindow(tk.Tk):
-    """Class for Admin window."""
 
-    def __init__(self, libraries_db: LibraryDatabase) -> None:
+class AdminMainWindow(tk.Toplevel):
+    """Class for Admin window (Toplevel of shared application root).
+    Closing it destroys the root and ends mainloop."""
+
+    def __init__(
+        self, libraries_db: LibraryDatabase, profiler: SessionProfiler | None = None
+    ) -> None:
         logging.debug("Initializing AdminMainWindow")
-        super().__init__()
+        super().__init__(get_root())
+        self.protocol("WM_DELETE_WINDOW", self.master.destroy)
         self._libraries_db = libraries_db
+        self._profiler = profiler
         self.title("Administrator Interface")
         self.geometry("800x600")
         self.create_widgets()
         center_window(self, width=800, height=600)
 
+        self._db_events = IdleBatcher(self, lambda _: self.refresh_statistics())
+        self._libraries_db.subscribe(self._db_events)
+
     def create_widgets(self):
         """Create all widgets of Admin window and set icon"""
         logging.debug("Calling AdminMainWindow create_widgets()")
@@ -75,6 +92,13 @@ class AdminMainWindow(tk.Tk):
         update_button = ttk.Button(self, text="Update DB", command=self.update_db)
         update_button.grid(row=0, column=3, padx=10, pady=10, sticky="ne")
 
+        history_frame = ttk.Frame(self)
+        history_frame.grid(row=0, column=0, padx=10, pady=10, sticky="nw")
+        undo_button = ttk.Button(history_frame, text="Undo", command=self.undo)
+        undo_button.grid(row=0, column=0)
+        redo_button = ttk.Button(history_frame, text="Redo", command=self.redo)
+        redo_button.grid(row=0, column=1, padx=(5, 0))
+
         contact_button = ttk.Button(
             self,
             text="Contact developer",
@@ -82,6 +106,14 @@ class AdminMainWindow(tk.Tk):
         )
         contact_button.grid(row=2, column=3, sticky="se", padx=10, pady=10)
 
+        if self._profiler is not None:
+            self._profile_button = ttk.Button(
+                self, text=self._profile_button_text(), command=self.toggle_profiling
+            )
+            self._profile_button.grid(row=2, column=3, sticky="ne", padx=10, pady=10)
+
+        self._create_statistics_panel()
+
         self.columnconfigure(0, weight=1)
         self.columnconfigure(1, weight=1)
         self.columnconfigure(2, weight=1)
@@ -90,54 +122,290 @@ class AdminMainWindow(tk.Tk):
         self.rowconfigure(1, weight=0)
         self.rowconfigure(2, weight=1)
 
+    def _create_statistics_panel(self) -> None:
+        """Create panel with libraries count per city"""
+        statistics_frame = ttk.LabelFrame(self, text="Statistics")
+        statistics_frame.grid(
+            row=2, column=0, columnspan=3, sticky="nsew", padx=10, pady=10
+        )
+
+        self._total_label = ttk.Label(statistics_frame)
+        self._total_label.grid(row=0, column=0, sticky="w", padx=5, pady=5)
+
+        refresh_button = ttk.Button(
+            statistics_frame, text="Refresh", command=self.refresh_statistics
+        )
+        refresh_button.grid(row=0, column=1, sticky="e", padx=5, pady=5)
+
+        self._city_tree = ttk.Treeview(
+            statistics_frame, columns=("libraries",), height=10
+        )
+        self._city_tree.heading("#0", text="City")
+        self._city_tree.heading("libraries", text="Libraries")
+        self._city_tree.grid(row=1, column=0, sticky="nsew")
+
+        city_scrollbar = ttk.Scrollbar(
+            statistics_frame, orient=tk.VERTICAL, command=self._city_tree.yview  # type: ignore
+        )
+        city_scrollbar.grid(row=1, column=1, sticky="nsw")
+        self._city_tree.configure(yscrollcommand=city_scrollbar.set)
+
+        statistics_frame.columnconfigure(0, weight=1)
+        statistics_frame.rowconfigure(1, weight=1)
+        self.refresh_statistics()
+
+    def refresh_statistics(self) -> None:
+        """Show current statistics (costs O(cities)).
+        Called once per Tk idle cycle after DB changes."""
+        city_statistics = self._libraries_db.get_city_statistics()
+        self._total_label.config(
+            text=f"Libraries: {self._libraries_db.get_libraries_count()}, "
+            f"cities: {len(city_statistics)}"
+        )
+        self._city_tree.delete(*self._city_tree.get_children())
+        for city, count in city_statistics:
+            self._city_tree.insert("", tk.END, text=city, values=(count,))
+
+    def undo(self) -> None:
+        """Undo last admin action and save DB"""
+        self._change_history(self._libraries_db.undo, "Undone")
+
+    def redo(self) -> None:
+        """Redo last undone admin action and save DB"""
+        self._change_history(self._libraries_db.redo, "Redone")
+
+    def _change_history(
+        self, history_action: Callable[[], Operation], action_name: str
+    ) -> None:
+        """Call undo/redo, save DB and show result"""
+        try:
+            operation = history_action()
+        except DatabaseException as e:
+            show_custom_message(self, "Error", str(e), "error")
+            return
+        try:
+            self._libraries_db.save_data(DB_PATH)
+        except DatabaseSaveError as e:
+            logging.exception(f"Failed to save DB after {action_name}")
+            show_custom_message(
+                self,
+                "Error",
+                f"{action_name}: {operation.description}, but failed to save changes! "
+                f"They will be lost when you close app!\n{e}\nContact system administrator.",
+                "error",
+            )
+            return
+        show_custom_message(self, "Success", f"{action_name}: {operation.description}")
+
+    def toggle_profiling(self) -> None:
+        """Start profiling or stop it and show paths of reports"""
+        if self._profiler is None:
+            return
+        if not self._profiler.is_running:
+            try:
+                self._profiler.start()
+            except ValueError as e:
+                logging.exception("Failed to start profiling")
+                messagebox.showerror(  # type: ignore
+                    "Error", f"Failed to start profiling\n{e}", parent=self
+                )
+        else:
+            try:
+                reports = self._profiler.stop()
+            except OSError as e:
+                logging.exception("Failed to write profiling reports")
+                messagebox.showerror(  # type: ignore
+                    "Error", f"Failed to write reports\n{e}", parent=self
+                )
+            else:
+                messagebox.showinfo(  # type: ignore
+                    "Profiling stopped",
+                    "Reports written:\n" + "\n".join(str(path) for path in reports),
+                    parent=self,
+                )
+        self._profile_button.config(text=self._profile_button_text())
+
+    def _profile_button_text(self) -> str:
+        """Text of profiling toggle for current state"""
+        running = self._profiler is not None and self._profiler.is_running
+        return "Stop profiling" if running else "Start profiling"
+
     def update_db(self) -> None:
-        """Reload DB from file (path stored in ./config.py)"""
+        """Apply changes made in DB file (path stored in ./config.py).
+        Only changed libraries are updated, open windows stay valid."""
         logging.debug("Updating DB...")
-        self._libraries_db.load_data(DB_PATH)
-        messagebox.showinfo("Success", "Database updated successfully")  # type: ignore
+        try:
+            report = self._libraries_db.merge_data(DB_PATH)
+        except DatabaseException as e:
+            messagebox.showerror(  # type: ignore
+                "Error", f"Failed to update DB, nothing was changed\n{e}", parent=self
+            )
+            return
+        if not report.changes_count():
+            messagebox.showinfo(  # type: ignore
+                "Success", "Database is already up to date", parent=self
+            )
+            return
+        messagebox.showinfo(  # type: ignore
+            "Success",
+            "Database updated successfully:\n"
+            f"{len(report.added)} libraries added\n"
+            f"{len(report.updated)} libraries updated\n"
+            f"{len(report.deleted)} libraries deleted",
+            parent=self,
+        )
 
 
 class LibraryListWindow:
-    """Base class for windows that display library lists"""
+    """Base class for windows that display library lists.
+    Only one page of libraries is read from DB, columns are sortable by click."""
+
+    _COLUMNS = {
+        SORT_BY_NAME: "Name",
+        SORT_BY_CITY: "City",
+        SORT_BY_ADDRESS: "Address",
+    }
 
     def __init__(
-        self, db: LibraryDatabase, root: tk.Tk, title: str, geometry: str = "400x600"
+        self,
+        db: LibraryDatabase,
+        root: tk.Tk | tk.Toplevel,
+        title: str,
+        geometry: str = "400x600",
     ) -> None:
         self._db = db
-        self._libs_info = db.get_readable_libs_info()
-
-        if len(self._libs_info) < 1:
-            messagebox.showinfo("No libraries", "No libraries avalible!")  # type: ignore
+        self._libs_info: list[tuple[str, str, str]] = []
+        self._sort_field: str | None = None
+        self._descending = False
+        self._offset = 0
+        self._is_open = False
+
+        if db.get_libraries_count() < 1:
+            messagebox.showinfo("No libraries", "No libraries avalible!", parent=root)  # type: ignore
             return
 
         self._window = tk.Toplevel(root)
         self._window.title(title)
         self._window.geometry(geometry)
+        self._is_open = True
 
         self._create_base_widgets()
         self._populate_list()
         self._configure_grid()
         center_window(self._window, root)
 
+        # Keep shown page consistent with DB while window is open
+        self._db_events = IdleBatcher(self._window, self._on_db_changed)
+        db.subscribe(self._db_events)
+        self._window.bind("<Destroy>", self._on_destroy, add="+")
+
+    def _on_db_changed(self, events: list[LibraryEvent]) -> None:
+        """Re-read only shown page after batch of DB changes"""
+        logging.debug(f"{len(events)} DB changes, refreshing shown page...")
+        try:
+            self._populate_list()
+        except tk.TclError:
+            logging.exception("Error updating libraries list:")
+
+    def _on_destroy(self, event: tk.Event) -> None:  # type: ignore
+        """Stop listening to DB changes when window is closed"""
+        if event.widget is self._window:
+            self._db.unsubscribe(self._db_events)
+            self._db_events.cancel()
+
     def _create_base_widgets(self):
         """Create common widgets"""
         self._title = ttk.Label(self._window, text="Libraries", font=("Arial", 14))
         self._title.grid(row=0, column=0, pady=50)
 
-        self._v_scrollbar = tk.Scrollbar(self._window, orient=tk.VERTICAL)
-        self._v_scrollbar.grid(column=1, row=1, sticky="ns")
+        list_frame = ttk.Frame(self._window)
+        list_frame.grid(row=1, column=0, sticky="nsew")
 
-        self._info_text = tk.Text(self._window, yscrollcommand=self._v_scrollbar.set)
-        self._info_text.grid(row=1, column=0, sticky="nsew")
+        self._libs_tree = ttk.Treeview(
+            list_frame, columns=tuple(self._COLUMNS), show="headings"
+        )
+        for column, heading in self._COLUMNS.items():
+            self._libs_tree.heading(
+                column, text=heading, command=lambda c=column: self._sort_by(c)
+            )
+        self._libs_tree.grid(row=0, column=0, sticky="nsew")
 
-        self._v_scrollbar.config(command=self._info_text.yview)  # type: ignore
+        self._v_scrollbar = ttk.Scrollbar(
+            list_frame, orient=tk.VERTICAL, command=self._libs_tree.yview  # type: ignore
+        )
+        self._v_scrollbar.grid(row=0, column=1, sticky="ns")
+        self._libs_tree.configure(yscrollcommand=self._v_scrollbar.set)
+
+        pages_frame = ttk.Frame(list_frame)
+        pages_frame.grid(row=1, column=0, columnspan=2, pady=5)
+        prev_button = ttk.Button(
+            pages_frame, text="<", width=3, command=lambda: self._change_page(-1)
+        )
+        prev_button.grid(row=0, column=0)
+        self._page_label = ttk.Label(pages_frame)
+        self._page_label.grid(row=0, column=1, padx=10)
+        next_button = ttk.Button(
+            pages_frame, text=">", width=3, command=lambda: self._change_page(1)
+        )
+        next_button.grid(row=0, column=2)
+
+        list_frame.columnconfigure(0, weight=1)
+        list_frame.rowconfigure(0, weight=1)
+
+    def _fetch_page(self, offset: int) -> list[tuple[str, str, str]]:
+        """Read one page of libraries from DB"""
+        return self._db.get_libs_page(
+            self._sort_field, offset, LIST_PAGE_SIZE, self._descending
+        )
+
+    def _pages_count(self) -> int | None:
+        """Number of pages / None if unknown"""
+        return max(-(-self._db.get_libraries_count() // LIST_PAGE_SIZE), 1)
 
     def _populate_list(self):
-        """Fill Text with libs info"""
-        for info_tuple in self._libs_info:
-            self._info_text.insert(
-                tk.END, f"{info_tuple[0]} - {info_tuple[1]}, {info_tuple[2]}\n"
-            )
+        """Fill Treeview with current page of libs info"""
+        self._libs_info = self._fetch_page(self._offset)
+        if not self._libs_info and self._offset > 0:
+            # Page became empty (libraries were deleted), show previous one
+            self._offset = max(self._offset - LIST_PAGE_SIZE, 0)
+            self._libs_info = self._fetch_page(self._offset)
+
+        self._libs_tree.delete(*self._libs_tree.get_children())
+        for index, info_tuple in enumerate(self._libs_info):
+            self._libs_tree.insert("", tk.END, iid=str(index), values=info_tuple)
+
+        page_text = f"Page {self._offset // LIST_PAGE_SIZE + 1}"
+        pages_count = self._pages_count()
+        if pages_count is not None:
+            page_text += f" of {pages_count}"
+        self._page_label.config(text=page_text)
+        self._on_page_shown()
+
+    def _on_page_shown(self) -> None:
+        """Called after new page is shown"""
+
+    def _change_page(self, direction: int) -> None:
+        """Go to previous (-1) or next (1) page"""
+        new_offset = self._offset + direction * LIST_PAGE_SIZE
+        if new_offset < 0 or not self._fetch_page(new_offset):
+            return
+        self._offset = new_offset
+        self._populate_list()
+
+    def _sort_by(self, column: str) -> None:
+        """Sort by column, second click on same column reverses order"""
+        if self._sort_field == column:
+            self._descending = not self._descending
+        else:
+            self._sort_field = column
+            self._descending = False
+        self._offset = 0
+
+        for other_column, heading in self._COLUMNS.items():
+            if other_column == column:
+                heading += " ▼" if self._descending else " ▲"
+            self._libs_tree.heading(other_column, text=heading)
+        self._populate_list()
 
     def _configure_grid(self):
         """Configure grid weights"""
@@ -149,29 +417,64 @@ class LibraryActionWindow(LibraryListWindow, ABC):
     """Abstract base for windows that preform actions on libraries"""
 
     def __init__(
-        self, db: LibraryDatabase, root: tk.Tk, title: str, geometry: str = "400x600"
+        self,
+        db: LibraryDatabase,
+        root: tk.Tk | tk.Toplevel,
+        title: str,
+        geometry: str = "400x600",
     ) -> None:
         super().__init__(db, root, title, geometry)
+        if self._is_open:
+            self._create_action_widgets()
+
+    def _create_base_widgets(self):
+        """Create common widgets and combobox for lib selection"""
+        super()._create_base_widgets()
         self._create_selection_widgets()
-        self._create_action_widgets()
+        self._libs_tree.bind("<<TreeviewSelect>>", self._on_tree_select)
 
     def _create_selection_widgets(self) -> None:
         """Create combobox for lib selection"""
-        libraries_to_choose = [
-            f"{info[0]} - {info[1]}, {info[2]}" for info in self._libs_info
-        ]
-
         self._selected_library = tk.StringVar(self._window)
         self._lib_combobox = ttk.Combobox(
             self._window,
             textvariable=self._selected_library,
-            values=libraries_to_choose,
         )
         self._lib_combobox["state"] = "readonly"
         self._lib_combobox.grid(row=2, column=0)
 
         self._window.rowconfigure(2, weight=1)
 
+    def _populate_list(self):
+        """Fill list and keep selected library chosen if it is still shown"""
+        selected = self._get_selected_library() if self._libs_info else None
+        super()._populate_list()
+        if selected is None:
+            return
+        for index, info in enumerate(self._libs_info):
+            if info[0] == selected[0]:
+                self._lib_combobox.current(index)
+                break
+
+    def _on_page_shown(self) -> None:
+        """Offer only libraries of shown page in combobox"""
+        libraries_to_choose = [
+            f"{info[0]} - {info[1]}, {info[2]}" for info in self._libs_info
+        ]
+        try:
+            self._lib_combobox.config(values=libraries_to_choose)
+            self._lib_combobox.set("")  # Reset chosen
+            # ensure it's still readonly
+            self._lib_combobox["state"] = "readonly"
+        except tk.TclError:
+            logging.exception("Error updating Combobox widget:")
+
+    def _on_tree_select(self, _: tk.Event) -> None:  # type: ignore
+        """Choose library selected in list in combobox"""
+        selection = self._libs_tree.selection()
+        if selection:
+            self._lib_combobox.current(int(selection[0]))
+
     @abstractmethod
     def _create_action_widgets(self) -> None:
         """Create widgets specific to the action"""
@@ -191,18 +494,56 @@ class LibraryActionWindow(LibraryListWindow, ABC):
 
 
 class ViewLibrariesWindow(LibraryListWindow):
-    """Window for viewing libraries list"""
+    """Window for viewing libraries list with full-text search"""
 
-    def __init__(self, db: LibraryDatabase, root: tk.Tk) -> None:
+    def __init__(self, db: LibraryDatabase, root: tk.Tk | tk.Toplevel) -> None:
+        self._query = ""
         super().__init__(db, root, "Libraries list")
+        if self._is_open:
+            self._create_search_widgets()
+
+    def _create_search_widgets(self) -> None:
+        """Create search entry"""
+        search_frame = ttk.Frame(self._window)
+        search_frame.grid(row=2, column=0, pady=10)
+
+        self._search_entry = ttk.Entry(search_frame)
+        self._search_entry.grid(row=0, column=0, padx=5)
+        self._search_entry.bind("<Return>", lambda _: self._search())
+
+        search_button = ttk.Button(search_frame, text="Search", command=self._search)
+        search_button.grid(row=0, column=1, padx=5)
+
+    def _search(self) -> None:
+        """Show first page of search results (all libraries if query is empty)"""
+        self._query = self._search_entry.get().strip()
+        self._offset = 0
+        self._populate_list()
+
+    def _fetch_page(self, offset: int) -> list[tuple[str, str, str]]:
+        """Read one page of search results or libraries list"""
+        if self._query:
+            return self._db.search_libraries(self._query, offset, LIST_PAGE_SIZE)
+        return super()._fetch_page(offset)
+
+    def _pages_count(self) -> int | None:
+        """Number of search results pages is unknown"""
+        return None if self._query else super()._pages_count()
+
+    def _sort_by(self, column: str) -> None:
+        """Sorting leaves search results and shows whole list"""
+        self._query = ""
+        self._search_entry.delete(0, tk.END)
+        super()._sort_by(column)
 
 
 class DeleteLibraryWindow(LibraryActionWindow):
     """Window for deleting libraries"""
 
-    def __init__(self, db: LibraryDatabase, root: tk.Tk) -> None:
+    def __init__(self, db: LibraryDatabase, root: tk.Tk | tk.Toplevel) -> None:
         super().__init__(db, root, "Delete Library")
-        self._window.geometry("600x800")
+        if self._is_open:
+            self._window.geometry("600x800")
 
     def _create_action_widgets(self) -> None:
         """Add deletion-specific widgets"""
@@ -243,10 +584,12 @@ class DeleteLibraryWindow(LibraryActionWindow):
 class EditLibraryWindow(LibraryActionWindow):
     """Window for editing libs info without losing data"""
 
-    def __init__(self, db: LibraryDatabase, root: tk.Tk) -> None:
+    def __init__(self, db: LibraryDatabase, root: tk.Tk | tk.Toplevel) -> None:
         super().__init__(db, root, "Edit library")
+        if not self._is_open:
+            return
         self._window.geometry("600x800")
-        messagebox.showinfo("Note", "Such library editing is SAFE. No data will be lost! \n :)")  # type: ignore
+        messagebox.showinfo("Note", "Such library editing is SAFE. No data will be lost! \n Any change can be reverted with 'Undo' button in main window :)", parent=self._window)  # type: ignore
 
     def _create_action_widgets(self) -> None:
         """Add editing-specific widgets"""
@@ -260,7 +603,7 @@ class EditLibraryWindow(LibraryActionWindow):
         """Handle editing libs"""
         library = self._get_selected_library()
         if not library:
-            messagebox.showerror("Error", "Please select a library to edit!")  # type: ignore
+            messagebox.showerror("Error", "Please select a library to edit!", parent=self._window)  # type: ignore
             return
         old_name, old_city, old_address = library
 
@@ -324,36 +667,6 @@ class EditLibraryWindow(LibraryActionWindow):
         # Center window
         center_window(self._edit_window, self._window)
 
-    def _refresh_lib_list(self):
-        """Refresh libraries list it Text & Combobox"""
-        logging.debug("Refreshing libs list...")
-        self._libs_info = self._db.get_readable_libs_info()
-
-        # Update text
-        try:
-            self._info_text.config(state=tk.NORMAL)
-            self._info_text.delete("1.0", tk.END)
-
-            for info_tuple in self._libs_info:
-                self._info_text.insert(
-                    tk.END, f"{info_tuple[0]} - {info_tuple[1]}, {info_tuple[2]}\n"
-                )
-            self._info_text.config(state=tk.DISABLED)
-        except tk.TclError as e:  # type: ignore
-            logging.exception("Error updating text:")
-
-        # Update combobox
-        try:
-            libraries_to_choose = [
-                f"{info[0]} - {info[1]}, {info[2]}" for info in self._libs_info
-            ]
-            self._lib_combobox.config(values=libraries_to_choose)
-            self._lib_combobox.set("")  # Reset chosen
-            # ensure it's still readonly
-            self._lib_combobox["state"] = "readonly"
-        except tk.TclError as e:  # type: ignore
-            logging.exception(f"Error updating Combobox widget:")
-
     def _perform_edit(
         self,
         lib_name: str,
@@ -373,13 +686,13 @@ class EditLibraryWindow(LibraryActionWindow):
             return old_address
 
         if not type:
-            messagebox.showerror("Error", "Please choose what to edit!")  # type: ignore
+            messagebox.showerror("Error", "Please choose what to edit!", parent=self._edit_window)  # type: ignore
             return
         if not new_value:
-            messagebox.showerror("Error", "Please enter new value!")  # type: ignore
+            messagebox.showerror("Error", "Please enter new value!", parent=self._edit_window)  # type: ignore
             return
         if type not in VALID_EDIT_TYPES:
-            messagebox.showerror("Error", f"Invalid edit type {type}") # type: ignore
+            messagebox.showerror("Error", f"Invalid edit type {type}", parent=self._edit_window) # type: ignore
             return
         old_value = get_old_value(type)
         if new_value == old_value:
@@ -413,18 +726,16 @@ class EditLibraryWindow(LibraryActionWindow):
                 "error"
             )
             return
-        else:
-            self._refresh_lib_list()
         self._edit_window.destroy()
 
 
-def set_icon(window: tk.Tk) -> None:
-    """Set window icon from path provided in ./config.py"""
+def set_icon(window: tk.Tk | tk.Toplevel) -> None:
+    """Set window icon from path provided in ./config.py
+    (image is decoded only once per application)"""
     try:
         logging.info(f"Attempt setting icon from {ICON_PATH}")
-        icon = tk.PhotoImage(file=ICON_PATH)
+        icon = load_image(ICON_PATH)  # Cache keeps link, so gc does not eat it
         window.tk.call("wm", "iconphoto", window._w, icon)  # type: ignore # Alternative way to install icon
-        window.icon = icon  # type: ignore # Saving link to make it not to be eaten by gc
     except tk.TclError as e:
         logging.error(f"ERROR installing icon\n{e}")
 
@@ -494,6 +805,7 @@ def set_password(
             messagebox.showerror(  # type: ignore
                 "Error",
                 f"Failed to save password!\n{e}\n Contact system administrator.\n You can continue working, but it is not recommended",
+                parent=password_window,
             )
         password_window.destroy()
         return True
@@ -542,6 +854,7 @@ def create_library(
             messagebox.showerror(  # type: ignore
                 "Error",
                 f"Failed to save library! It will be lost when you close app!\n{e}\n Contact system administrator.\n You can continue working, but it is not recommended",
+                parent=window,
             )
         window.destroy()
     except ValueError as error:
@@ -555,7 +868,9 @@ def create_library(
     window.destroy()
 
 
-def init_create_library_window(libraries_db: LibraryDatabase, root: tk.Tk) -> None:
+def init_create_library_window(
+    libraries_db: LibraryDatabase, root: tk.Tk | tk.Toplevel
+) -> None:
     """Create window for creating library"""
     create_library_window = tk.Toplevel()
     create_library_window.title("Create library")
@@ -603,14 +918,11 @@ def ask_for_password(db: LibraryDatabase) -> bool:
     Shows modal window for password entry
     :return: True if password is correct, False otherwise
     """
-    logging.debug("ask_for_password: Creating temp root...")
-    dialog_root = tk.Tk()
-    dialog_root.geometry("1x1+-100+-100")  # Hide, but cannot use withdraw
-
     logging.debug("ask_for_password: Creating Toplevel dialog...")
-    password_dialog = tk.Toplevel(dialog_root)
+    # Not transient: root is hidden and transient window would be hidden too
+    password_dialog = tk.Toplevel(get_root())
     password_dialog.title("Authentication")
-    password_dialog.transient(dialog_root)
+    set_icon(password_dialog)
 
     password_ok = False
 
@@ -664,9 +976,6 @@ def ask_for_password(db: LibraryDatabase) -> bool:
     logging.debug("ask_for_password: Calling wait_window()")
     password_dialog.wait_window()
     logging.debug("ask_for_password: wait_window finished.")
-
-    logging.debug("ask_for_password: destroying temp root...")
-    dialog_root.destroy()
     logging.debug(f"ask_for_password: returning {password_ok}")
 
     return password_ok
@@ -4,6 +4,44 @@ import sys
 import logging
 import tkinter as tk
 from pathlib import Path
+from typing import Any, Callable
+
+# Single Tk interpreter of application and images decoded in it
+_root: tk.Tk | None = None
+_images: dict[Path, tk.PhotoImage] = {}
+
+
+def get_root() -> tk.Tk:
+    """Get application Tk root (hidden), creating it on first call.
+    Loading window, dialogs and main window are all Toplevels of this root,
+    so only one Tcl/Tk interpreter is started."""
+    global _root
+    if _root is None or not _root_exists(_root):
+        logging.debug("Creating application Tk root...")
+        _root = tk.Tk()
+        _root.withdraw()
+        _images.clear()
+    return _root
+
+
+def _root_exists(root: tk.Tk) -> bool:
+    """Is root not destroyed yet"""
+    try:
+        return bool(root.winfo_exists())
+    except tk.TclError:
+        return False
+
+
+def load_image(image_path: Path) -> tk.PhotoImage:
+    """Get image decoded once per application (cached by path).
+    Raises:
+        tk.TclError: If image can not be loaded
+    """
+    root = get_root()
+    if image_path not in _images:
+        logging.info(f"Decoding image {image_path}")
+        _images[image_path] = tk.PhotoImage(master=root, file=image_path)
+    return _images[image_path]
 
 
 def center_window(
@@ -57,6 +95,46 @@ def center_window(
     window_to_center.geometry(f"{win_width}x{win_height}+{x}+{y}")
 
 
+class IdleBatcher:
+    """Collects items and passes them to callback in one batch
+    when Tk is idle (so many changes cause one widgets update)."""
+
+    def __init__(
+        self, widget: tk.Misc, callback: Callable[[list[Any]], None]
+    ) -> None:
+        self._widget = widget
+        self._callback = callback
+        self._items: list[Any] = []
+        self._after_id: str | None = None
+
+    def __call__(self, item: Any) -> None:
+        """Add item to batch and schedule flushing"""
+        self._items.append(item)
+        if self._after_id is None:
+            try:
+                self._after_id = self._widget.after_idle(self._flush)
+            except tk.TclError:
+                logging.warning("Widget destroyed, dropping batched items")
+                self._items.clear()
+
+    def cancel(self) -> None:
+        """Drop collected items and scheduled flushing"""
+        if self._after_id is not None:
+            try:
+                self._widget.after_cancel(self._after_id)
+            except tk.TclError:
+                pass
+        self._after_id = None
+        self._items.clear()
+
+    def _flush(self) -> None:
+        """Pass collected items to callback"""
+        items, self._items = self._items, []
+        self._after_id = None
+        if items:
+            self._callback(items)
+
+
 def setup_logging(log_file: Path) -> None:
     """Logging setup"""
     log_level = logging.DEBUG
@@ -0,0 +1,80 @@
+"""Undo/redo history logic"""
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+
+# Default number of operations that can be undone
+DEFAULT_HISTORY_DEPTH = 100
+
+# Constants for operation kinds
+OPERATION_ADD = "add"
+OPERATION_DELETE = "delete"
+OPERATION_EDIT = "edit"
+OPERATION_BATCH = "batch"
+
+
+@dataclass
+class Operation:
+    """One undoable operation.
+
+    Only what is needed to invert the operation is stored: affected record,
+    its position (insertion order key) for deletes and old/new value for
+    edits. Batch operation
+    consists of parts that are undone in reverse order."""
+
+    kind: str
+    description: str
+    target: Any = None
+    position: int = -1
+    field_name: str = ""
+    old_value: str = ""
+    new_value: str = ""
+    parts: list["Operation"] = field(default_factory=list)
+
+
+class OperationHistory:
+    """Bounded undo and redo stacks.
+    Oldest operations are forgotten when depth is exceeded."""
+
+    def __init__(self, max_depth: int = DEFAULT_HISTORY_DEPTH) -> None:
+        if max_depth < 1:
+            raise ValueError("History depth must be positive.")
+        self._undo_stack: deque[Operation] = deque(maxlen=max_depth)
+        self._redo_stack: deque[Operation] = deque(maxlen=max_depth)
+
+    def can_undo(self) -> bool:
+        """Is there an operation to undo"""
+        return bool(self._undo_stack)
+
+    def can_redo(self) -> bool:
+        """Is there an operation to redo"""
+        return bool(self._redo_stack)
+
+    def record(self, operation: Operation) -> None:
+        """Record new operation. Redo stack is dropped."""
+        self._undo_stack.append(operation)
+        self._redo_stack.clear()
+
+    def pop_undo(self) -> Operation:
+        """Move last operation to redo stack and return it.
+        Raises:
+            IndexError: If there is nothing to undo
+        """
+        operation = self._undo_stack.pop()
+        self._redo_stack.append(operation)
+        return operation
+
+    def pop_redo(self) -> Operation:
+        """Move last undone operation back to undo stack and return it.
+        Raises:
+            IndexError: If there is nothing to redo
+        """
+        operation = self._redo_stack.pop()
+        self._undo_stack.append(operation)
+        return operation
+
+    def clear(self) -> None:
+        """Forget all operations"""
+        self._undo_stack.clear()
+        self._redo_stack.clear()
@@ -1,17 +1,15 @@
 import tkinter as tk
 from tkinter import ttk
 
-from logic.gui_utils import center_window
+from logic.gui_utils import center_window, get_root
 
 
 class LoadingWindow:
     """Class for loading widow."""
 
     def __init__(self) -> None:
-        self._temp_root = tk.Tk()
-        self._temp_root.geometry("1x1+-100+-100")
         # Create loading window
-        self._loading_window = tk.Toplevel(self._temp_root)
+        self._loading_window = tk.Toplevel(get_root())
         self._loading_window.title("Loading...")
         self._loading_window.geometry("300x100")
         self._loading_window.overrideredirect(True)
@@ -27,8 +25,8 @@ class LoadingWindow:
         self._loading_window.update()  # Update window to make it display
 
     def close(self) -> None:
-        if self._loading_window.winfo_exists():
-            self._loading_window.destroy()
-
-        if self._temp_root.winfo_exists():
-            self._temp_root.destroy()
+        try:
+            if self._loading_window.winfo_exists():
+                self._loading_window.destroy()
+        except tk.TclError:
+            pass  # Application root is already destroyed
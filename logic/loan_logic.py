@@ -0,0 +1,203 @@
+"""Loans ledger logic (borrowing and returning books)"""
+
+import heapq
+import logging
+
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import count
+from typing import Any, Iterable, Iterator
+
+# Constants for loans data keys
+_LOAN_BOOK_ID_DATA_KEY = "book_id"
+_LOAN_CLIENT_DATA_KEY = "client"
+_LOAN_BORROWED_AT_DATA_KEY = "borrowed_at"
+_LOAN_DUE_AT_DATA_KEY = "due_at"
+
+
+@dataclass
+class Loan:
+    """Open loan of one book"""
+
+    book_id: str
+    client: str
+    borrowed_at: datetime
+    due_at: datetime
+
+
+class LoanLedger:
+    """Open loans of one library.
+
+    Loans are indexed by book and by client, so borrow/return checks are O(1).
+    Due dates are indexed for all libraries at once by DueIndex."""
+
+    def __init__(self) -> None:
+        self._by_book: dict[str, Loan] = {}
+        self._by_client: dict[str, dict[str, Loan]] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_book)
+
+    def __iter__(self) -> Iterator[Loan]:
+        return iter(self._by_book.values())
+
+    def borrow(
+        self,
+        book_id: str,
+        client: str,
+        due_at: datetime,
+        borrowed_at: datetime | None = None,
+    ) -> Loan:
+        """Open a new loan.
+        Raises:
+            ValueError: If fields are empty or book is already borrowed
+        """
+        if not book_id or not client:
+            logging.warning("Empty book ID or client while borrowing. Raising VE...")
+            raise ValueError("Book ID and client must be filled.")
+        if book_id in self._by_book:
+            raise ValueError(
+                f"Book '{book_id}' is already borrowed by {self._by_book[book_id].client}"
+            )
+        borrowed_at = borrowed_at if borrowed_at else datetime.now()
+        if due_at < borrowed_at:
+            raise ValueError("Due date can not be earlier than borrowing date.")
+
+        loan = Loan(book_id, client, borrowed_at, due_at)
+        self._add_loan(loan)
+        return loan
+
+    def return_book(self, book_id: str) -> Loan:
+        """Close loan of book.
+        Returns:
+            closed loan
+        Raises:
+            ValueError: If book is not borrowed
+        """
+        loan = self._by_book.pop(book_id, None)
+        if loan is None:
+            logging.warning(f"Book '{book_id}' is not borrowed. Raising ValueError...")
+            raise ValueError(f"Book '{book_id}' is not borrowed")
+
+        client_loans = self._by_client[loan.client]
+        del client_loans[book_id]
+        if not client_loans:
+            del self._by_client[loan.client]
+        return loan
+
+    def get_loan(self, book_id: str) -> Loan | None:
+        """Get open loan of book / None if book is not borrowed"""
+        return self._by_book.get(book_id)
+
+    def client_loans(self, client: str) -> list[Loan]:
+        """Get all open loans of client"""
+        return list(self._by_client.get(client, {}).values())
+
+    def to_data(self) -> list[dict[str, str]]:
+        """Get loans data for saving to DB"""
+        return [
+            {
+                _LOAN_BOOK_ID_DATA_KEY: loan.book_id,
+                _LOAN_CLIENT_DATA_KEY: loan.client,
+                _LOAN_BORROWED_AT_DATA_KEY: loan.borrowed_at.isoformat(),
+                _LOAN_DUE_AT_DATA_KEY: loan.due_at.isoformat(),
+            }
+            for loan in self._by_book.values()
+        ]
+
+    @classmethod
+    def from_data(cls, loans_data: list[dict[str, Any]]) -> "LoanLedger":
+        """Build ledger from DB data.
+        Raises:
+            KeyError: If loan structure is invalid
+            ValueError: If loan data is invalid or book is borrowed twice
+        """
+        ledger = cls()
+        for loan_data in loans_data:
+            loan = Loan(
+                loan_data[_LOAN_BOOK_ID_DATA_KEY],
+                loan_data[_LOAN_CLIENT_DATA_KEY],
+                datetime.fromisoformat(loan_data[_LOAN_BORROWED_AT_DATA_KEY]),
+                datetime.fromisoformat(loan_data[_LOAN_DUE_AT_DATA_KEY]),
+            )
+            if loan.book_id in ledger._by_book:
+                raise ValueError(f"Book '{loan.book_id}' is borrowed twice")
+            ledger._add_loan(loan)
+        return ledger
+
+    def _add_loan(self, loan: Loan) -> None:
+        """Add loan to indexes"""
+        self._by_book[loan.book_id] = loan
+        self._by_client.setdefault(loan.client, {})[loan.book_id] = loan
+
+
+class DueIndex:
+    """Due dates of open loans of many ledgers (e.g. all libraries).
+
+    Loans are kept in one binary heap together with their owner, so getting
+    k most overdue loans of all owners costs O(k log k) however many owners
+    there are. Removed loans are dropped from heap lazily (heap is compacted
+    when more than half of it is stale)."""
+
+    def __init__(self) -> None:
+        self._due_heap: list[tuple[datetime, int, Any, Loan]] = []
+        # id of loan -> its current heap entry
+        self._entries: dict[int, tuple[datetime, int, Any, Loan]] = {}
+        self._sequence = count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, owner: Any, loan: Loan) -> None:
+        """Index loan of owner (nothing happens if it is already indexed)"""
+        if id(loan) in self._entries:
+            return
+        entry = (loan.due_at, next(self._sequence), owner, loan)
+        self._entries[id(loan)] = entry
+        heapq.heappush(self._due_heap, entry)
+
+    def discard(self, loan: Loan) -> None:
+        """Remove loan from index (nothing happens if it is not indexed)"""
+        if self._entries.pop(id(loan), None) is None:
+            return
+        while self._due_heap and self._is_stale(self._due_heap[0]):
+            heapq.heappop(self._due_heap)
+        if len(self._due_heap) > 2 * len(self._entries):
+            logging.debug("Compacting global due heap...")
+            self._due_heap = list(self._entries.values())
+            heapq.heapify(self._due_heap)
+
+    def rebuild(self, loans: Iterable[tuple[Any, Loan]]) -> None:
+        """Replace indexed loans with pairs (owner, loan)"""
+        self._entries = {}
+        for owner, loan in loans:
+            self._entries[id(loan)] = (loan.due_at, next(self._sequence), owner, loan)
+        self._due_heap = list(self._entries.values())
+        heapq.heapify(self._due_heap)
+
+    def overdue(self, now: datetime | None = None) -> Iterator[tuple[Any, Loan]]:
+        """Iterate over pairs (owner, loan) with due date before now, most
+        overdue first.
+
+        Walks the heap as a tree with a small frontier heap, so getting k
+        overdue loans costs O(k log k) and never touches loans that are not
+        overdue."""
+        now = now if now else datetime.now()
+        heap = self._due_heap
+        if not heap:
+            return
+        frontier = [(heap[0][0], heap[0][1], 0)]
+        while frontier:
+            due_at, _, position = heapq.heappop(frontier)
+            if due_at >= now:
+                return
+            entry = heap[position]
+            if not self._is_stale(entry):
+                yield entry[2], entry[3]
+            for child in (2 * position + 1, 2 * position + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child][0], heap[child][1], child))
+
+    def _is_stale(self, entry: tuple[datetime, int, Any, Loan]) -> bool:
+        """Is heap entry left from a removed loan"""
+        return self._entries.get(id(entry[3])) is not entry
@@ -0,0 +1,359 @@
+"""Multi-version snapshots logic (readers never wait for writers)
+
+Indexes are kept in copy-on-write containers. Writer changes its own copy
+of the few chunks it touches, freezing makes an immutable view that shares
+all other chunks with previous versions. So publishing a version costs
+O(N / chunk size) references, not O(N).
+"""
+
+import threading
+import weakref
+
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass, field, replace
+from itertools import accumulate
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Hashable,
+    Iterable,
+    Iterator,
+    Mapping,
+    overload,
+)
+
+if TYPE_CHECKING:
+    from logic.search_logic import SearchIndexView
+
+# Maximal number of entries in one chunk of sorted list (it is split when
+# it grows bigger and merged with neighbour when it gets 4 times smaller)
+DEFAULT_CHUNK_SIZE = 512
+
+# Number of shards of versioned dict
+DEFAULT_SHARDS_COUNT = 256
+
+
+class SortedView:
+    """Immutable sorted sequence, frozen version of VersionedSortedList.
+    Positional access and bisect cost O(log N + chunk size)."""
+
+    __slots__ = ("_chunks", "_maxes", "_ends")
+
+    def __init__(
+        self,
+        chunks: tuple[list[Any], ...] = (),
+        maxes: tuple[Any, ...] = (),
+    ) -> None:
+        self._chunks = chunks
+        self._maxes = maxes
+        # Position after the last entry of every chunk
+        self._ends = tuple(accumulate(map(len, chunks)))
+
+    @classmethod
+    def from_sorted(
+        cls, entries: list[Any], chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> "SortedView":
+        """Build view of already sorted entries (they are not sorted again)"""
+        if len(entries) <= chunk_size:
+            # Most postings of search index fit one chunk
+            return cls((entries,), (entries[-1],)) if entries else cls()
+        chunks = tuple(
+            entries[start : start + chunk_size]
+            for start in range(0, len(entries), chunk_size)
+        )
+        return cls(chunks, tuple(chunk[-1] for chunk in chunks))
+
+    def __len__(self) -> int:
+        return self._ends[-1] if self._ends else 0
+
+    def __iter__(self) -> Iterator[Any]:
+        for chunk in self._chunks:
+            yield from chunk
+
+    @overload
+    def __getitem__(self, index: int) -> Any: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[Any]: ...
+
+    def __getitem__(self, index: int | slice) -> Any:
+        """Get entry by position or list of entries of slice (step is not
+        supported)"""
+        if not isinstance(index, slice):
+            position = index + len(self) if index < 0 else index
+            if not 0 <= position < len(self):
+                raise IndexError("SortedView index out of range")
+            chunk_index = bisect_right(self._ends, position)
+            chunk = self._chunks[chunk_index]
+            return chunk[position - self._ends[chunk_index] + len(chunk)]
+        start, stop, _ = index.indices(len(self))
+        result: list[Any] = []
+        chunk_index = bisect_right(self._ends, start)
+        while start < stop and chunk_index < len(self._chunks):
+            chunk_start = self._ends[chunk_index] - len(self._chunks[chunk_index])
+            chunk = self._chunks[chunk_index]
+            result.extend(chunk[start - chunk_start : stop - chunk_start])
+            start = self._ends[chunk_index]
+            chunk_index += 1
+        return result
+
+    def bisect_left(self, entry: Any) -> int:
+        """Position where entry would be inserted (before equal ones)"""
+        chunk_index = bisect_left(self._maxes, entry)
+        if chunk_index == len(self._chunks):
+            return len(self)
+        chunk = self._chunks[chunk_index]
+        return self._ends[chunk_index] - len(chunk) + bisect_left(chunk, entry)
+
+
+class VersionedSortedList:
+    """Sorted list of entries for writer, frozen to SortedView for readers.
+
+    Entries are stored in chunks. Chunk shared with a frozen view is copied
+    before the first change after freezing, later changes of the same
+    version change the copy in place."""
+
+    def __init__(
+        self, entries: Iterable[Any] = (), chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> None:
+        if chunk_size < 4:
+            raise ValueError("Chunk size must be at least 4.")
+        self._chunk_size = chunk_size
+        view = SortedView.from_sorted(sorted(entries), chunk_size)
+        self._chunks: list[list[Any]] = list(view._chunks)
+        self._maxes: list[Any] = list(view._maxes)
+        # Chunks changed since last freeze (not shared with any view)
+        self._owned: list[bool] = [True] * len(self._chunks)
+        self._length = len(view)
+        self._view: SortedView | None = None
+
+    @classmethod
+    def from_view(
+        cls, view: SortedView, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> "VersionedSortedList":
+        """Start writer list from frozen view, O(chunks).
+        All chunks stay shared with view until they are changed."""
+        versioned = cls(chunk_size=chunk_size)
+        versioned._chunks = list(view._chunks)
+        versioned._maxes = list(view._maxes)
+        versioned._owned = [False] * len(versioned._chunks)
+        versioned._length = len(view)
+        versioned._view = view
+        return versioned
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[Any]:
+        for chunk in self._chunks:
+            yield from chunk
+
+    def add(self, entry: Any) -> None:
+        """Insert entry keeping order"""
+        self._view = None
+        self._length += 1
+        if not self._chunks:
+            self._chunks.append([entry])
+            self._maxes.append(entry)
+            self._owned.append(True)
+            return
+        chunk_index = min(bisect_left(self._maxes, entry), len(self._chunks) - 1)
+        chunk = self._own(chunk_index)
+        insort(chunk, entry)
+        self._maxes[chunk_index] = chunk[-1]
+        if len(chunk) > self._chunk_size:
+            half = chunk[len(chunk) // 2 :]
+            del chunk[len(chunk) // 2 :]
+            self._maxes[chunk_index] = chunk[-1]
+            self._chunks.insert(chunk_index + 1, half)
+            self._maxes.insert(chunk_index + 1, half[-1])
+            self._owned.insert(chunk_index + 1, True)
+
+    def remove(self, entry: Any) -> bool:
+        """Remove one entry equal to given one.
+        Returns:
+            False if there is no such entry
+        """
+        chunk_index = bisect_left(self._maxes, entry)
+        if chunk_index == len(self._chunks):
+            return False
+        position = bisect_left(self._chunks[chunk_index], entry)
+        if self._chunks[chunk_index][position] != entry:
+            return False
+        self._view = None
+        self._length -= 1
+        chunk = self._own(chunk_index)
+        del chunk[position]
+        if not chunk:
+            del self._chunks[chunk_index], self._maxes[chunk_index]
+            del self._owned[chunk_index]
+            return True
+        self._maxes[chunk_index] = chunk[-1]
+        if len(chunk) < self._chunk_size // 4 and len(self._chunks) > 1:
+            # Merge small chunk into neighbour, so chunks count stays O(N / size)
+            left = chunk_index - 1 if chunk_index else chunk_index
+            merged = self._chunks[left] + self._chunks[left + 1]
+            self._chunks[left : left + 2] = [merged]
+            self._maxes[left : left + 2] = [merged[-1]]
+            self._owned[left : left + 2] = [True]
+        return True
+
+    def freeze(self) -> SortedView:
+        """Get immutable view of current entries (cached until next change)"""
+        if self._view is None:
+            self._view = SortedView(tuple(self._chunks), tuple(self._maxes))
+            self._owned = [False] * len(self._chunks)
+        return self._view
+
+    def _own(self, chunk_index: int) -> list[Any]:
+        """Get chunk for changing, copying it if it is shared with a view"""
+        if not self._owned[chunk_index]:
+            self._chunks[chunk_index] = list(self._chunks[chunk_index])
+            self._owned[chunk_index] = True
+        return self._chunks[chunk_index]
+
+
+class DictView(Mapping[Hashable, Any]):
+    """Immutable mapping, frozen version of VersionedDict"""
+
+    __slots__ = ("_shards", "_length")
+
+    def __init__(self, shards: tuple[dict[Hashable, Any], ...] = (), length: int = 0):
+        self._shards = shards
+        self._length = length
+
+    def __getitem__(self, key: Hashable) -> Any:
+        if not self._shards:
+            raise KeyError(key)
+        return self._shards[hash(key) % len(self._shards)][key]
+
+    def __iter__(self) -> Iterator[Hashable]:
+        for shard in self._shards:
+            yield from shard
+
+    def __len__(self) -> int:
+        return self._length
+
+
+class VersionedDict:
+    """Dict for writer, frozen to DictView for readers.
+    Keys are split to shards by hash, shard shared with a view is copied
+    before the first change after freezing."""
+
+    def __init__(
+        self,
+        items: Iterable[tuple[Hashable, Any]] = (),
+        shards_count: int = DEFAULT_SHARDS_COUNT,
+    ) -> None:
+        if shards_count < 1:
+            raise ValueError("Shards count must be positive.")
+        self._shards: list[dict[Hashable, Any]] = [{} for _ in range(shards_count)]
+        for key, value in items:
+            self._shards[hash(key) % shards_count][key] = value
+        self._owned = [True] * shards_count
+        self._length = sum(len(shard) for shard in self._shards)
+        self._view: DictView | None = None
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._shard(key)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get value of key / default if there is no such key"""
+        return self._shard(key).get(key, default)
+
+    def values(self) -> Iterator[Any]:
+        """Iterate over values"""
+        for shard in self._shards:
+            yield from shard.values()
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Set value of key"""
+        shard = self._own(key)
+        self._length += key not in shard
+        shard[key] = value
+
+    def discard(self, key: Hashable) -> None:
+        """Remove key (nothing happens if there is no such key)"""
+        if key in self._shard(key):
+            del self._own(key)[key]
+            self._length -= 1
+
+    def freeze(self) -> DictView:
+        """Get immutable view of current items (cached until next change)"""
+        if self._view is None:
+            self._view = DictView(tuple(self._shards), self._length)
+            self._owned = [False] * len(self._shards)
+        return self._view
+
+    def _shard(self, key: Hashable) -> dict[Hashable, Any]:
+        """Shard of key for reading"""
+        return self._shards[hash(key) % len(self._shards)]
+
+    def _own(self, key: Hashable) -> dict[Hashable, Any]:
+        """Shard of key for changing, copied if it is shared with a view"""
+        shard_index = hash(key) % len(self._shards)
+        self._view = None
+        if not self._owned[shard_index]:
+            self._shards[shard_index] = dict(self._shards[shard_index])
+            self._owned[shard_index] = True
+        return self._shards[shard_index]
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """Immutable version of libraries and all their indexes.
+    Entries of sorted views are tuples (key, name, city, address):
+    libraries - by insertion order key, sort_orders - by locale collation key
+    of field, prefix_orders - by casefolded field, value_indexes - by
+    normalized field. city_stats maps normalized city to tuple
+    (displayed city, libraries count)."""
+
+    version: int
+    libraries: SortedView = field(default_factory=SortedView)
+    sort_orders: Mapping[str, SortedView] = field(default_factory=dict)
+    prefix_orders: Mapping[str, SortedView] = field(default_factory=dict)
+    value_indexes: Mapping[str, SortedView] = field(default_factory=dict)
+    search_index: "SearchIndexView | None" = None
+    city_stats: Mapping[Hashable, Any] = field(default_factory=DictView)
+
+    def __len__(self) -> int:
+        return len(self.libraries)
+
+
+class VersionStore:
+    """Current snapshot of data and its publishing.
+
+    Writer builds new snapshot and swaps one reference to it, reader pins
+    version just by taking that reference (atomic, no locks). Snapshot is
+    reclaimed by reference counting when the last reader drops it."""
+
+    def __init__(self) -> None:
+        self._current = Snapshot(0)
+        self._publish_lock = threading.Lock()
+        # Versions still held by someone, for diagnostics
+        self._live: weakref.WeakValueDictionary[int, Snapshot] = (
+            weakref.WeakValueDictionary()
+        )
+        self._live[0] = self._current
+
+    def pin(self) -> Snapshot:
+        """Get current snapshot. It never changes, even after next publish."""
+        return self._current
+
+    def publish(self, snapshot: Snapshot) -> Snapshot:
+        """Make snapshot current (its version is replaced with next one).
+        Returns:
+            published snapshot
+        """
+        with self._publish_lock:
+            snapshot = replace(snapshot, version=self._current.version + 1)
+            self._live[snapshot.version] = snapshot
+            self._current = snapshot
+        return snapshot
+
+    def live_versions(self) -> list[int]:
+        """Get versions not reclaimed yet (current one and pinned by readers)"""
+        return sorted(self._live.keys())
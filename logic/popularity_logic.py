@@ -0,0 +1,204 @@
+"""Books popularity logic (streaming top-k of borrowed books)"""
+
+from typing import Any, Callable
+
+# Default number of tracked keys. Counts are overestimated by at most
+# (number of borrows / capacity), keys borrowed more often are never lost.
+DEFAULT_POPULARITY_CAPACITY = 1000
+
+# Default number of most popular books returned
+DEFAULT_TOP_SIZE = 10
+
+# Constants for popularity data keys
+_CAPACITY_DATA_KEY = "capacity"
+_TOTAL_DATA_KEY = "total"
+_COUNTERS_DATA_KEY = "counters"
+
+
+class _Bucket:
+    """Keys with equal count, node of buckets list sorted by count"""
+
+    __slots__ = ("count", "keys", "lower", "higher")
+
+    def __init__(self, count: int) -> None:
+        self.count = count
+        self.keys: dict[str, None] = {}  # Ordered set, oldest key first
+        self.lower: _Bucket | None = None
+        self.higher: _Bucket | None = None
+
+
+class PopularityTracker:
+    """Approximate counts of most frequent keys (Space-Saving algorithm).
+
+    At most capacity keys are counted. When new key comes and all counters
+    are used, key with minimal count is replaced and new key inherits its
+    count (remembered as possible error). Counters are grouped in buckets
+    of equal count linked in sorted order, so adding is O(1) and top-k is
+    O(k)."""
+
+    def __init__(self, capacity: int = DEFAULT_POPULARITY_CAPACITY) -> None:
+        if capacity < 1:
+            raise ValueError("Popularity capacity must be positive.")
+        self.capacity = capacity
+        self.total = 0
+        # Key -> (bucket, overestimation)
+        self._counters: dict[str, tuple[_Bucket, int]] = {}
+        self._min_bucket: _Bucket | None = None
+        self._max_bucket: _Bucket | None = None
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+    def add(self, key: str) -> None:
+        """Count one more occurrence of key"""
+        self.total += 1
+        if key in self._counters:
+            bucket, error = self._counters[key]
+            self._move_up(key, bucket, error)
+            return
+        if len(self._counters) < self.capacity:
+            if self._min_bucket is None or self._min_bucket.count != 1:
+                self._link_bucket(_Bucket(1), None)
+            self._min_bucket.keys[key] = None  # type: ignore[union-attr]
+            self._counters[key] = (self._min_bucket, 0)  # type: ignore[assignment]
+            return
+
+        # Replace oldest of least counted keys
+        bucket = self._min_bucket
+        evicted = next(iter(bucket.keys))  # type: ignore[union-attr]
+        del self._counters[evicted]
+        bucket.keys[key] = None  # type: ignore[union-attr]
+        del bucket.keys[evicted]  # type: ignore[union-attr]
+        self._move_up(key, bucket, bucket.count)  # type: ignore[arg-type]
+
+    def top(self, k: int = DEFAULT_TOP_SIZE) -> list[tuple[str, int]]:
+        """Get k most frequent keys, most frequent first.
+        Returns:
+            list of tuples (key, estimated count)
+        """
+        result: list[tuple[str, int]] = []
+        bucket = self._max_bucket
+        while bucket is not None and len(result) < k:
+            for key in bucket.keys:
+                if len(result) >= k:
+                    break
+                result.append((key, bucket.count))
+            bucket = bucket.lower
+        return result
+
+    def count(self, key: str) -> int:
+        """Get estimated count of key (0 if it is not tracked)"""
+        if key not in self._counters:
+            return 0
+        return self._counters[key][0].count
+
+    def error(self, key: str) -> int:
+        """Get maximal overestimation of key count
+        (for untracked key: maximal count it may have)"""
+        if key not in self._counters:
+            return self._min_bucket.count if self._min_bucket else 0
+        return self._counters[key][1]
+
+    def to_data(self) -> dict[str, Any]:
+        """Get popularity data for saving to DB"""
+        counters: list[list[Any]] = []
+        bucket = self._min_bucket
+        while bucket is not None:
+            for key in bucket.keys:
+                counters.append([key, bucket.count, self._counters[key][1]])
+            bucket = bucket.higher
+        return {
+            _CAPACITY_DATA_KEY: self.capacity,
+            _TOTAL_DATA_KEY: self.total,
+            _COUNTERS_DATA_KEY: counters,
+        }
+
+    @classmethod
+    def from_data(
+        cls,
+        data: dict[str, Any],
+        capacity: int | None = None,
+        rename: Callable[[str], str] | None = None,
+    ) -> "PopularityTracker":
+        """Build tracker from DB data.
+        Args:
+            capacity: capacity of built tracker, None for saved one. If it is
+                smaller than number of saved counters, least counted ones are
+                dropped (error bound of untracked keys stays the same)
+            rename: function giving new key of saved key, counters of keys
+                renamed to the same key are summed up
+        Raises:
+            KeyError: If popularity structure is invalid
+            ValueError: If counters are invalid or exceed saved capacity
+        """
+        saved_capacity = int(data[_CAPACITY_DATA_KEY])
+        tracker = cls(saved_capacity if capacity is None else capacity)
+        tracker.total = int(data[_TOTAL_DATA_KEY])
+        saved_counters = [
+            (str(key), int(count), int(error))
+            for key, count, error in data[_COUNTERS_DATA_KEY]
+        ]
+        if len(saved_counters) > saved_capacity:
+            raise ValueError("More popularity counters than capacity")
+        # Key -> [count, error], in saved order
+        merged: dict[str, list[int]] = {}
+        for key, count, error in saved_counters:
+            if count < 1 or not 0 <= error < count:
+                raise ValueError(f"Invalid popularity counter of {key!r}")
+            key = rename(key) if rename else key
+            if key in merged:
+                if rename is None:
+                    raise ValueError(f"Invalid popularity counter of {key!r}")
+                merged[key][0] += count
+                merged[key][1] += error
+            else:
+                merged[key] = [count, error]
+        counters = sorted(
+            ((count, key, error) for key, (count, error) in merged.items()),
+            key=lambda counter: counter[0],  # Stable, keeps order in bucket
+        )
+        dropped = max(len(counters) - tracker.capacity, 0)
+        for count, key, error in counters[dropped:]:
+            bucket = tracker._max_bucket
+            if bucket is None or bucket.count != count:
+                bucket = _Bucket(count)
+                tracker._link_bucket(bucket, tracker._max_bucket)
+            bucket.keys[key] = None
+            tracker._counters[key] = (bucket, error)
+        return tracker
+
+    def _move_up(self, key: str, bucket: _Bucket, error: int) -> None:
+        """Move key from its bucket to bucket with count bigger by one"""
+        higher = bucket.higher
+        if higher is None or higher.count != bucket.count + 1:
+            higher = _Bucket(bucket.count + 1)
+            self._link_bucket(higher, bucket)
+        del bucket.keys[key]
+        higher.keys[key] = None
+        self._counters[key] = (higher, error)
+        if not bucket.keys:
+            self._unlink_bucket(bucket)
+
+    def _link_bucket(self, bucket: _Bucket, lower: _Bucket | None) -> None:
+        """Insert bucket after lower one (as minimal if lower is None)"""
+        higher = lower.higher if lower else self._min_bucket
+        bucket.lower, bucket.higher = lower, higher
+        if lower:
+            lower.higher = bucket
+        else:
+            self._min_bucket = bucket
+        if higher:
+            higher.lower = bucket
+        else:
+            self._max_bucket = bucket
+
+    def _unlink_bucket(self, bucket: _Bucket) -> None:
+        """Remove empty bucket from list"""
+        if bucket.lower:
+            bucket.lower.higher = bucket.higher
+        else:
+            self._min_bucket = bucket.higher
+        if bucket.higher:
+            bucket.higher.lower = bucket.lower
+        else:
+            self._max_bucket = bucket.lower
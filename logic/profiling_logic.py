@@ -0,0 +1,173 @@
+"""Session profiling logic (cProfile and tracemalloc reports)"""
+
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import tracemalloc
+
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+from logic.db_logic import LibraryDatabase
+
+# Environment variable enabling profiling: "1" - CPU only, "memory" - CPU and
+# memory snapshots around DB load/save
+PROFILE_ENV_VAR = "LIBRARY_PROFILE"
+PROFILE_MEMORY_VALUE = "memory"
+
+# Number of functions and allocation places in text reports
+STATS_TOP_SIZE = 50
+MEMORY_TOP_SIZE = 20
+
+# Methods of LibraryDatabase wrapped with memory snapshots
+_TRACED_METHODS = ("load_data", "merge_data", "save_data")
+
+
+def profiling_from_env() -> tuple[bool, bool]:
+    """Read profiling switch from environment.
+    Returns:
+        tuple (profile, trace memory)
+    """
+    value = os.environ.get(PROFILE_ENV_VAR, "").strip().lower()
+    if value in ("", "0", "false", "no"):
+        return False, False
+    return True, value == PROFILE_MEMORY_VALUE
+
+
+class SessionProfiler:
+    """Profiles application between start() and stop().
+    Reports are written to report_dir named by profiling start time:
+    .pstats (for pstats/snakeviz), .txt (top functions by cumulative time)
+    and -memory.txt (allocations made by traced DB methods)."""
+
+    def __init__(self, report_dir: Path, trace_memory: bool = False) -> None:
+        self._report_dir = Path(report_dir)
+        self.trace_memory = trace_memory
+        self._profile: cProfile.Profile | None = None
+        self._report_base: Path | None = None
+
+    @property
+    def is_running(self) -> bool:
+        """Is session being profiled now"""
+        return self._profile is not None
+
+    def start(self) -> None:
+        """Start profiling (nothing happens if already started).
+        Raises:
+            ValueError: If another profiler is active in this thread
+        """
+        if self._profile is not None:
+            return
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        self._report_base = self._report_dir / f"profile-{stamp}"
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        profile = cProfile.Profile()
+        profile.enable()
+        self._profile = profile
+        logging.info(f"Profiling started, reports: {self._report_base}.*")
+
+    def stop(self) -> list[Path]:
+        """Stop profiling and write reports.
+        Returns:
+            paths of written reports
+        Raises:
+            OSError: If reports can not be written
+        """
+        if self._profile is None or self._report_base is None:
+            return []
+        profile, self._profile = self._profile, None
+        profile.disable()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+        stats_path = self._report_base.with_suffix(".pstats")
+        text_path = self._report_base.with_suffix(".txt")
+        profile.dump_stats(stats_path)
+        stream = io.StringIO()
+        stats = pstats.Stats(profile, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(STATS_TOP_SIZE)
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(STATS_TOP_SIZE)
+        text_path.write_text(stream.getvalue(), encoding="utf-8")
+
+        reports = [stats_path, text_path]
+        memory_path = self._memory_report_path()
+        if memory_path.exists():
+            reports.append(memory_path)
+        logging.info(f"Profiling stopped, reports written: {reports}")
+        return reports
+
+    def wrap_database(self, db: LibraryDatabase) -> None:
+        """Take memory snapshots around load_data, merge_data and save_data of
+        db while memory is traced (methods are replaced on instance)."""
+        for method_name in _TRACED_METHODS:
+            method = getattr(db, method_name)
+            setattr(db, method_name, self._traced(method_name, method))
+
+    def _traced(self, name: str, method: Callable[..., Any]) -> Callable[..., Any]:
+        """Wrap method with memory snapshots"""
+
+        @functools.wraps(method)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not (self.is_running and tracemalloc.is_tracing()):
+                return method(*args, **kwargs)
+            # Snapshots handling is not a part of profiled session
+            self._pause()
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+            self._resume()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._pause()
+                after = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+                self._write_memory_report(name, before, after, peak)
+                self._resume()
+
+        return wrapper
+
+    def _pause(self) -> None:
+        """Stop collecting CPU profile temporarily"""
+        if self._profile is not None:
+            self._profile.disable()
+
+    def _resume(self) -> None:
+        """Continue collecting CPU profile"""
+        if self._profile is not None:
+            self._profile.enable()
+
+    def _write_memory_report(
+        self,
+        name: str,
+        before: tracemalloc.Snapshot,
+        after: tracemalloc.Snapshot,
+        peak: int,
+    ) -> None:
+        """Append top allocation differences of one call to memory report"""
+        filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ]
+        differences = after.filter_traces(filters).compare_to(
+            before.filter_traces(filters), "lineno"
+        )
+        lines = [
+            f"== {name} at {datetime.now().isoformat(timespec='seconds')}, "
+            f"peak {peak / 1024:.1f} KiB"
+        ]
+        lines.extend(str(difference) for difference in differences[:MEMORY_TOP_SIZE])
+        try:
+            with open(self._memory_report_path(), "a", encoding="utf-8") as file:
+                file.write("\n".join(lines) + "\n\n")
+        except OSError:
+            logging.exception("Failed to write memory report:")
+
+    def _memory_report_path(self) -> Path:
+        """Path of memory report of current session"""
+        assert self._report_base is not None
+        return self._report_base.with_name(self._report_base.name + "-memory.txt")
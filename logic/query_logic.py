@@ -0,0 +1,77 @@
+"""Libraries query predicates logic"""
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+
+from logic.text_utils import normalize_key
+
+# Constants for queried fields
+QUERY_FIELD_NAME = "name"
+QUERY_FIELD_CITY = "city"
+QUERY_FIELD_ADDRESS = "address"
+VALID_QUERY_FIELDS = {QUERY_FIELD_NAME, QUERY_FIELD_CITY, QUERY_FIELD_ADDRESS}
+
+
+@dataclass(frozen=True)
+class Predicate(ABC):
+    """Base class for conditions on library field.
+    Raises:
+        ValueError: If field is not 'name', 'city' or 'address'
+    """
+
+    field_name: str
+
+    def __post_init__(self) -> None:
+        if self.field_name not in VALID_QUERY_FIELDS:
+            raise ValueError(
+                f"Invalid query field: {self.field_name}. Must be one of {VALID_QUERY_FIELDS}"
+            )
+
+    @abstractmethod
+    def matches(self, value: str) -> bool:
+        """Does field value satisfy condition"""
+        pass
+
+
+@dataclass(frozen=True)
+class Eq(Predicate):
+    """Field is equal to value (compared normalized, as duplicates are)"""
+
+    value: str
+    key: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+        # Frozen dataclass, so cached key is set bypassing __setattr__
+        object.__setattr__(self, "key", normalize_key(self.value))
+
+    def matches(self, value: str) -> bool:
+        return normalize_key(value) == self.key
+
+
+@dataclass(frozen=True)
+class Prefix(Predicate):
+    """Field starts with prefix (case-insensitive)"""
+
+    prefix: str
+
+    def matches(self, value: str) -> bool:
+        return value.casefold().startswith(self.prefix.casefold())
+
+
+@dataclass(frozen=True)
+class In(Predicate):
+    """Field is equal to one of values (compared normalized)"""
+
+    values: tuple[str, ...]
+    keys: frozenset[str] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+        # Frozen dataclass, so cached keys are set bypassing __setattr__
+        object.__setattr__(
+            self, "keys", frozenset(normalize_key(item) for item in self.values)
+        )
+
+    def matches(self, value: str) -> bool:
+        return normalize_key(value) in self.keys
@@ -0,0 +1,274 @@
+"""Shared-memory read replica logic (one publisher, many local readers)
+
+Snapshot is published to a new data segment, then its name is written to a
+small control segment together with incremented version. Readers map data
+segment zero-copy and decode only records they access; they remap only
+when version in control segment changes.
+
+Control segment layout: version (uint64, odd while being written), length
+of data segment name (uint8), data segment name.
+Data segment layout: version (uint64), records count (uint32), table of
+count * 3 + 1 offsets (uint32) and UTF-8 encoded fields of records
+(name, city, address) one after another.
+"""
+
+import logging
+import struct
+
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Iterable, Iterator
+
+_CONTROL_FORMAT = "<QB"
+_CONTROL_HEADER_SIZE = struct.calcsize(_CONTROL_FORMAT)
+_CONTROL_SIZE = 128
+_MAX_SEGMENT_NAME_LENGTH = _CONTROL_SIZE - _CONTROL_HEADER_SIZE
+_HEADER_FORMAT = "<QI"
+_HEADER_SIZE = struct.calcsize(_HEADER_FORMAT)
+_OFFSET_SIZE = struct.calcsize("<I")
+_FIELDS_PER_RECORD = 3
+
+# Segments created by this process (resource tracker must keep them)
+_owned_segments: set[str] = set()
+
+# How many times reader retries when publisher changes snapshot meanwhile
+_READ_ATTEMPTS = 100
+
+
+class ReplicaError(Exception):
+    """Replica is not published or can not be read"""
+
+
+def encode_snapshot(version: int, libs_info: Iterable[tuple[str, str, str]]) -> bytes:
+    """Encode libraries to replica data segment format.
+    Raises:
+        ValueError: If snapshot is too big for 32-bit offsets
+    """
+    fields: list[bytes] = []
+    for lib_info in libs_info:
+        fields.extend(value.encode("utf-8") for value in lib_info)
+    count = len(fields) // _FIELDS_PER_RECORD
+
+    offsets = [0]
+    for value in fields:
+        offsets.append(offsets[-1] + len(value))
+    if offsets[-1] > 0xFFFFFFFF:
+        raise ValueError("Snapshot is too big for replica")
+    return b"".join(
+        [
+            struct.pack(_HEADER_FORMAT, version, count),
+            struct.pack(f"<{len(offsets)}I", *offsets),
+            *fields,
+        ]
+    )
+
+
+class ReplicaPublisher:
+    """Owner of replica, publishes immutable snapshots.
+    Existing control segment with same name (left by crashed publisher) is
+    taken over, so readers keep working after publisher restart."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        try:
+            self._control = SharedMemory(name, create=True, size=_CONTROL_SIZE)
+            self._control.buf[:_CONTROL_SIZE] = bytes(_CONTROL_SIZE)
+        except FileExistsError:
+            logging.warning(f"Replica {name} already exists, taking it over")
+            self._control = SharedMemory(name)
+        _owned_segments.add(self._control.name)
+        self._data: SharedMemory | None = None
+        self.version: int = self._read_control()[0]
+        self.version += self.version % 2  # Previous owner died while writing
+
+    def publish(self, libs_info: Iterable[tuple[str, str, str]]) -> int:
+        """Publish new snapshot of libraries.
+        Args:
+            libs_info: tuples (name, city, address)
+        Returns:
+            version of published snapshot
+        """
+        version = self.version + 2
+        payload = encode_snapshot(version, libs_info)
+        data = SharedMemory(create=True, size=max(len(payload), 1))
+        _owned_segments.add(data.name)
+        data.buf[: len(payload)] = payload
+        segment_name = data.name.encode("utf-8")
+        if len(segment_name) > _MAX_SEGMENT_NAME_LENGTH:
+            data.close()
+            data.unlink()
+            raise ReplicaError(f"Too long shared memory name: {data.name}")
+
+        # Seqlock: readers retry while version is odd or has changed
+        struct.pack_into("<Q", self._control.buf, 0, version - 1)
+        struct.pack_into(
+            f"<B{len(segment_name)}s",
+            self._control.buf,
+            struct.calcsize("<Q"),
+            len(segment_name),
+            segment_name,
+        )
+        struct.pack_into("<Q", self._control.buf, 0, version)
+
+        # Readers that mapped old segment keep their mapping after unlink
+        self._release_data()
+        self._data = data
+        self.version = version
+        logging.info(f"Replica {self.name}: published version {version}")
+        return version
+
+    def close(self) -> None:
+        """Remove replica. Attached readers keep last mapped snapshot."""
+        self._release_data()
+        self._control.close()
+        try:
+            self._control.unlink()
+        except FileNotFoundError:
+            pass
+        _owned_segments.discard(self._control.name)
+
+    def _read_control(self) -> tuple[int, int]:
+        """Get (version, segment name length) from control segment"""
+        return struct.unpack_from(_CONTROL_FORMAT, self._control.buf, 0)
+
+    def _release_data(self) -> None:
+        """Close and unlink current data segment"""
+        if self._data is None:
+            return
+        self._data.close()
+        try:
+            self._data.unlink()
+        except FileNotFoundError:
+            pass
+        _owned_segments.discard(self._data.name)
+        self._data = None
+
+
+class ReplicaReader:
+    """Read-only view of published libraries.
+    Records are decoded lazily on access, call refresh() to see new version.
+    Raises:
+        ReplicaError: If replica is not published
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        try:
+            self._control = _attach(name)
+        except FileNotFoundError as e:
+            raise ReplicaError(f"Replica {name} is not published") from e
+        self._data: SharedMemory | None = None
+        self.version: int = 0
+        self._count = 0
+        self.refresh()
+
+    def refresh(self) -> bool:
+        """Remap data segment if new version is published.
+        Returns:
+            True if snapshot was changed
+        Raises:
+            ReplicaError: If replica was removed or is being rewritten too long
+        """
+        for _ in range(_READ_ATTEMPTS):
+            version, length = struct.unpack_from(
+                _CONTROL_FORMAT, self._control.buf, 0
+            )
+            if version == 0:
+                raise ReplicaError(f"Replica {self.name} has no snapshot yet")
+            if version == self.version:
+                return False
+            if version % 2:
+                continue
+            segment_name = bytes(
+                self._control.buf[_CONTROL_HEADER_SIZE : _CONTROL_HEADER_SIZE + length]
+            ).decode("utf-8", errors="replace")  # Torn name is rejected below
+            if struct.unpack_from("<Q", self._control.buf, 0)[0] != version:
+                continue
+            try:
+                data = _attach(segment_name)
+            except FileNotFoundError:
+                continue  # Replaced by newer version right now
+
+            data_version, count = struct.unpack_from(_HEADER_FORMAT, data.buf, 0)
+            if data_version != version:
+                data.close()
+                continue
+            self._close_data()
+            self._data = data
+            self.version = version
+            self._count = count
+            logging.debug(f"Replica {self.name}: mapped version {version}")
+            return True
+        raise ReplicaError(f"Failed to read replica {self.name}")
+
+    def get_libraries_count(self) -> int:
+        """Get number of libraries in mapped snapshot"""
+        return self._count
+
+    def get_library(self, index: int) -> tuple[str, str, str]:
+        """Decode one library from mapped snapshot.
+        Returns:
+            tuple (name, city, address)
+        Raises:
+            IndexError: If index is out of range
+        """
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count or self._data is None:
+            raise IndexError("Library index out of range")
+        buf = self._data.buf
+        start = _HEADER_SIZE + index * _FIELDS_PER_RECORD * _OFFSET_SIZE
+        offsets = struct.unpack_from(f"<{_FIELDS_PER_RECORD + 1}I", buf, start)
+        fields_start = _HEADER_SIZE + (
+            self._count * _FIELDS_PER_RECORD + 1
+        ) * _OFFSET_SIZE
+        name, city, address = (
+            str(buf[fields_start + begin : fields_start + end], "utf-8")
+            for begin, end in zip(offsets, offsets[1:])
+        )
+        return name, city, address
+
+    def iter_libraries(self) -> Iterator[tuple[str, str, str]]:
+        """Iterate over libraries of snapshot mapped at the moment of call"""
+        for index in range(self._count):
+            yield self.get_library(index)
+
+    def get_readable_libs_info(self) -> list[tuple[str, str, str]]:
+        """Get readable info of all libraries (same as LibraryDatabase does)
+        Returns:
+            list of tuples (name, city, address)
+        """
+        return list(self.iter_libraries())
+
+    def close(self) -> None:
+        """Unmap replica"""
+        self._close_data()
+        self._control.close()
+
+    def _close_data(self) -> None:
+        """Unmap current data segment"""
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+            self._count = 0
+
+
+def _attach(name: str) -> SharedMemory:
+    """Attach to existing segment without taking ownership.
+    Before Python 3.13 attaching registers segment in resource tracker, which
+    unlinks it when reader exits, so it is unregistered here (unless segment
+    was created by this process)."""
+    try:
+        return SharedMemory(name, track=False)  # type: ignore[call-arg]
+    except TypeError:
+        pass
+    segment = SharedMemory(name)
+    if segment.name in _owned_segments:
+        return segment  # Publisher in this process still owns it
+    try:
+        resource_tracker.unregister(
+            segment._name, "shared_memory"  # type: ignore[attr-defined]
+        )
+    except (AttributeError, KeyError):
+        pass
+    return segment
@@ -0,0 +1,449 @@
+"""Full-text search logic (inverted index with BM25 ranking)"""
+
+import functools
+import heapq
+import math
+import re
+import unicodedata
+
+from bisect import bisect_left
+from dataclasses import dataclass
+from itertools import count
+from typing import Any, Callable, Hashable, Iterable, Iterator, Sequence
+
+from logic.mvcc_logic import (
+    DEFAULT_CHUNK_SIZE,
+    DictView,
+    SortedView,
+    VersionedDict,
+    VersionedSortedList,
+)
+
+# Default page size for search results
+DEFAULT_PAGE_SIZE = 20
+
+# BM25 parameters
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+# Postings read at once while ranking
+_RANKING_BATCH_SIZE = 64
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text to normalized (NFKC, casefolded) word tokens"""
+    return _TOKEN_PATTERN.findall(unicodedata.normalize("NFKC", text).casefold())
+
+
+class SearchIndex:
+    """Inverted index over text documents.
+
+    Every document is a set of text fields under a hashable key. Postings keep
+    term frequency per document, so adding, updating and removing a document
+    only touches its own terms. Postings of a term are also kept in impact
+    order for pruned ranking, that order is rebuilt on first search after
+    the term changes."""
+
+    def __init__(self) -> None:
+        self._postings: dict[str, dict[Hashable, int]] = {}
+        # Term -> postings (-frequency, document length, key) in impact order
+        self._impact_orders: dict[str, list[tuple[int, int, Hashable]]] = {}
+        self._doc_terms: dict[Hashable, tuple[str, ...]] = {}
+        self._doc_lengths: dict[Hashable, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._doc_lengths
+
+    def add_document(self, key: Hashable, *fields: str) -> None:
+        """Index document. Already indexed document is replaced."""
+        if key in self._doc_lengths:
+            self.remove_document(key)
+
+        frequencies, length = _document_terms(fields)
+        for term, frequency in frequencies.items():
+            self._postings.setdefault(term, {})[key] = frequency
+            self._impact_orders.pop(term, None)
+        self._doc_terms[key] = tuple(frequencies)
+        self._doc_lengths[key] = length
+        self._total_length += length
+
+    def remove_document(self, key: Hashable) -> None:
+        """Remove document from index (nothing happens if it is not indexed)"""
+        terms = self._doc_terms.pop(key, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings[term]
+            del postings[key]
+            if not postings:
+                del self._postings[term]
+            self._impact_orders.pop(term, None)
+        self._total_length -= self._doc_lengths.pop(key)
+
+    def search(
+        self, query: str, offset: int = 0, limit: int = DEFAULT_PAGE_SIZE
+    ) -> list[tuple[Hashable, float]]:
+        """Get page of documents matching any query term.
+        Returns:
+            list of tuples (key, score), best first
+        """
+        query_terms = []
+        for term in sorted(set(tokenize(query))):
+            postings = self._postings.get(term)
+            if postings:
+                query_terms.append(
+                    _QueryTerm(
+                        len(postings),
+                        self._impact_order(term),
+                        functools.partial(_dict_frequency, postings),
+                    )
+                )
+        return _rank(
+            query_terms, len(self._doc_lengths), self._total_length, offset, limit
+        )
+
+    def _impact_order(self, term: str) -> list[tuple[int, int, Hashable]]:
+        """Postings of term in impact order (built once after change)"""
+        impact_order = self._impact_orders.get(term)
+        if impact_order is None:
+            impact_order = [
+                (-frequency, self._doc_lengths[key], key)
+                for key, frequency in self._postings[term].items()
+            ]
+            # Keys may be not comparable, so only frequency and length are
+            impact_order.sort(key=lambda posting: (posting[0], posting[1]))
+            self._impact_orders[term] = impact_order
+        return impact_order
+
+
+class SearchIndexView:
+    """Immutable version of VersionedSearchIndex, searched like SearchIndex"""
+
+    def __init__(
+        self,
+        postings: DictView | None = None,
+        docs_count: int = 0,
+        total_length: int = 0,
+    ) -> None:
+        self._postings = postings if postings is not None else DictView()
+        self._docs_count = docs_count
+        self._total_length = total_length
+
+    def __len__(self) -> int:
+        return self._docs_count
+
+    def search(
+        self, query: str, offset: int = 0, limit: int = DEFAULT_PAGE_SIZE
+    ) -> list[tuple[Hashable, float]]:
+        """Get page of documents matching any query term.
+        Returns:
+            list of tuples (key, score), best first
+        """
+        query_terms = []
+        for term in sorted(set(tokenize(query))):
+            postings = self._postings.get(term)
+            if postings:
+                query_terms.append(
+                    _QueryTerm(
+                        len(postings),
+                        postings,
+                        functools.partial(
+                            _sorted_frequency, postings, _frequency_runs(postings)
+                        ),
+                    )
+                )
+        return _rank(
+            query_terms, self._docs_count, self._total_length, offset, limit
+        )
+
+
+class VersionedSearchIndex:
+    """Inverted index for writer, frozen to SearchIndexView for readers.
+
+    Postings of every term are versioned sorted lists of tuples
+    (-term frequency, document length, key), which is impact order used by
+    pruned ranking. Change of a document copies only chunks it is in. Keys
+    must be sortable. Document fields are passed to remove_document too,
+    terms are not stored.
+    Most terms are rare, so postings built at once are frozen as plain
+    tuples when they fit one chunk, writer list is made only for changed
+    terms."""
+
+    def __init__(self, documents: Iterable[tuple[Any, ...]] = ()) -> None:
+        """Args:
+        documents: tuples (key, *fields) to index at once
+        """
+        prepared = []
+        for key, *fields in documents:
+            frequencies, length = _document_terms(fields)
+            prepared.append((length, key, frequencies))
+        # Documents are appended to postings by length and key, so postings
+        # come out sorted (only ones with different frequencies are sorted
+        # again, stable sort keeps that order inside every frequency)
+        prepared.sort(key=lambda document: document[:2])
+        postings: dict[str, list[tuple[int, int, Any]]] = {}
+        mixed_terms: set[str] = set()
+        for length, key, frequencies in prepared:
+            for term, frequency in frequencies.items():
+                postings.setdefault(term, []).append((-frequency, length, key))
+                if frequency > 1:
+                    mixed_terms.add(term)
+        for term in mixed_terms:
+            postings[term].sort(key=lambda posting: posting[0])
+
+        self._docs_count = len(prepared)
+        self._total_length = sum(length for length, _, _ in prepared)
+        self._frozen_postings = VersionedDict(
+            (term, _freeze_postings(entries)) for term, entries in postings.items()
+        )
+        # Writer lists are started from frozen views of changed terms only
+        self._postings: dict[str, VersionedSortedList] = {}
+        self._dirty_terms: set[str] = set()
+        self._view: SearchIndexView | None = None
+
+    def __len__(self) -> int:
+        return self._docs_count
+
+    def add_document(self, key: Any, *fields: str) -> None:
+        """Index document (key must not be indexed yet)"""
+        frequencies, length = _document_terms(fields)
+        for term, frequency in frequencies.items():
+            self._writable_postings(term).add((-frequency, length, key))
+            self._dirty_terms.add(term)
+        self._docs_count += 1
+        self._total_length += length
+        self._view = None
+
+    def remove_document(self, key: Any, *fields: str) -> None:
+        """Remove document indexed with the same fields"""
+        frequencies, length = _document_terms(fields)
+        for term, frequency in frequencies.items():
+            if term not in self._postings and term not in self._frozen_postings:
+                continue
+            if self._writable_postings(term).remove((-frequency, length, key)):
+                self._dirty_terms.add(term)
+        self._docs_count -= 1
+        self._total_length -= length
+        self._view = None
+
+    def freeze(self) -> SearchIndexView:
+        """Get immutable view of index (cached until next change)"""
+        if self._view is None:
+            for term in self._dirty_terms:
+                postings = self._postings[term]
+                if postings:
+                    self._frozen_postings.set(term, postings.freeze())
+                else:
+                    del self._postings[term]
+                    self._frozen_postings.discard(term)
+            self._dirty_terms.clear()
+            self._view = SearchIndexView(
+                self._frozen_postings.freeze(), self._docs_count, self._total_length
+            )
+        return self._view
+
+    def _writable_postings(self, term: str) -> VersionedSortedList:
+        """Writer list of term postings, started on first change of term"""
+        postings = self._postings.get(term)
+        if postings is None:
+            frozen = self._frozen_postings.get(term)
+            if frozen is None:
+                postings = VersionedSortedList()
+            elif isinstance(frozen, tuple):
+                postings = VersionedSortedList(frozen)
+            else:
+                postings = VersionedSortedList.from_view(frozen)
+            self._postings[term] = postings
+        return postings
+
+
+@dataclass
+class _QueryTerm:
+    """Postings of one query term prepared for ranking"""
+
+    postings_count: int
+    # Postings (-frequency, document length, key) sorted by frequency and
+    # length (by key too in versioned index), list or SortedView
+    impact_order: Any
+    # (key, document length) -> term frequency in document / 0
+    frequency: Callable[[Hashable, int], int]
+
+
+def _document_terms(fields: Iterable[str]) -> tuple[dict[str, int], int]:
+    """Get term frequencies and length (number of tokens) of document"""
+    # Fields are joined by space, so their tokens are never joined
+    tokens = tokenize(" ".join(fields))
+    # Documents are short, plain dict counts them faster than Counter
+    frequencies: dict[str, int] = {}
+    for token in tokens:
+        frequencies[token] = frequencies.get(token, 0) + 1
+    return frequencies, len(tokens)
+
+
+def _dict_frequency(postings: dict[Hashable, int], key: Hashable, _: int) -> int:
+    """Frequency of term in document by its postings in SearchIndex"""
+    return postings.get(key, 0)
+
+
+def _sorted_frequency(
+    postings: Sequence[tuple[int, int, Any]],
+    runs: list[tuple[int, int, int]],
+    key: Hashable,
+    length: int,
+) -> int:
+    """Frequency of term in document by its postings in versioned index
+    (SortedView or tuple).
+    Args:
+        runs: frequency runs of postings (see _frequency_runs)
+    """
+    find = _bisector(postings)
+    for negative_frequency, _, stop in runs:
+        entry = (negative_frequency, length, key)
+        position = find(entry)
+        if position < stop and postings[position] == entry:
+            return -negative_frequency
+    return 0
+
+
+def _frequency_runs(impact_order: Any) -> list[tuple[int, int, int]]:
+    """Slices of postings with the same frequency, O(runs log N).
+    Returns:
+        list of tuples (-frequency, start, stop)
+    """
+    find = _bisector(impact_order)
+    runs = []
+    start = 0
+    while start < len(impact_order):
+        negative_frequency = impact_order[start][0]
+        # Probe is shorter than postings, so their keys are never compared
+        stop = find((negative_frequency + 1,))
+        runs.append((negative_frequency, start, stop))
+        start = stop
+    return runs
+
+
+def _bisector(entries: Any) -> Callable[[Any], int]:
+    """bisect_left of SortedView or of plain sorted sequence"""
+    if isinstance(entries, SortedView):
+        return entries.bisect_left
+    return functools.partial(bisect_left, entries)
+
+
+def _freeze_postings(entries: list[tuple[int, int, Any]]) -> Any:
+    """Frozen postings of term: tuple if they fit one chunk, else SortedView"""
+    if len(entries) <= DEFAULT_CHUNK_SIZE:
+        return tuple(entries)
+    return SortedView.from_sorted(entries)
+
+
+def _iterate_slice(entries: Any, start: int, stop: int) -> Iterator[Any]:
+    """Iterate over entries[start:stop] reading them in batches"""
+    for batch_start in range(start, stop, _RANKING_BATCH_SIZE):
+        yield from entries[batch_start : min(batch_start + _RANKING_BATCH_SIZE, stop)]
+
+
+def _rank(
+    query_terms: list[_QueryTerm],
+    docs_count: int,
+    total_length: int,
+    offset: int,
+    limit: int,
+) -> list[tuple[Hashable, float]]:
+    """Page of documents by BM25 score with top-k pruning (threshold
+    algorithm).
+
+    Postings of every term are read in descending order of their score (runs
+    of one frequency are ordered by length and merged), scores of a new
+    document in other terms are looked up. Reading stops when k-th best
+    score is not less than sum of last read scores of all terms, no unread
+    document can score more. So common terms cost about O(k), not
+    O(postings)."""
+    if not docs_count or limit <= 0 or not query_terms:
+        return []
+    average_length = total_length / docs_count
+    idfs = [
+        math.log(
+            1
+            + (docs_count - term.postings_count + 0.5) / (term.postings_count + 0.5)
+        )
+        for term in query_terms
+    ]
+
+    def term_score(idf: float, frequency: int, length: int) -> float:
+        length_norm = _BM25_K1 * (1 - _BM25_B + _BM25_B * length / average_length)
+        return idf * frequency * (_BM25_K1 + 1) / (frequency + length_norm)
+
+    streams = [
+        _impact_stream(term.impact_order, functools.partial(term_score, idf))
+        for term, idf in zip(query_terms, idfs)
+    ]
+    bounds = [math.inf] * len(streams)
+    size = offset + limit
+    # Min-heap of (score, -sequence, key), earlier read wins among equal
+    best: list[tuple[float, int, Hashable]] = []
+    seen: set[Hashable] = set()
+    sequence = count()
+    while True:
+        exhausted = True
+        for stream_index, stream in enumerate(streams):
+            posting = next(stream, None)
+            if posting is None:
+                bounds[stream_index] = 0.0
+                continue
+            exhausted = False
+            bounds[stream_index], negative_frequency, length, key = posting
+            if key in seen:
+                continue
+            seen.add(key)
+            score = 0.0
+            for term_index, (term, idf) in enumerate(zip(query_terms, idfs)):
+                frequency = (
+                    -negative_frequency
+                    if term_index == stream_index
+                    else term.frequency(key, length)
+                )
+                score += term_score(idf, frequency, length) if frequency else 0.0
+            entry = (score, -next(sequence), key)
+            if len(best) < size:
+                heapq.heappush(best, entry)
+            elif entry[:2] > best[0][:2]:
+                heapq.heapreplace(best, entry)
+        if exhausted or (len(best) == size and best[0][0] >= sum(bounds)):
+            break
+
+    ranked = sorted(best, key=lambda entry: entry[:2], reverse=True)
+    return [(key, score) for score, _, key in ranked[offset:]]
+
+
+def _impact_stream(
+    impact_order: Any, score: Callable[[int, int], float]
+) -> Iterator[tuple[float, int, int, Hashable]]:
+    """Iterate over postings of term in descending order of score.
+    Yields:
+        tuples (score, -frequency, document length, key)
+    """
+    heads: list[tuple[float, int, tuple[Any, ...], Iterator[Any]]] = []
+    for run_index, (negative_frequency, start, stop) in enumerate(
+        _frequency_runs(impact_order)
+    ):
+        # Run has one frequency and is ordered by length, so its score falls
+        run = _iterate_slice(impact_order, start, stop)
+        posting = next(run)
+        heads.append((-score(-posting[0], posting[1]), run_index, posting, run))
+    heapq.heapify(heads)
+    while heads:
+        negative_score, run_index, posting, run = heads[0]
+        yield -negative_score, *posting
+        posting = next(run, None)
+        if posting is None:
+            heapq.heappop(heads)
+        else:
+            heapq.heapreplace(
+                heads, (-score(-posting[0], posting[1]), run_index, posting, run)
+            )
@@ -0,0 +1,212 @@
+"""DB files storage logic (compression and streaming JSON)"""
+
+import gzip
+import json
+import lzma
+import re
+
+from pathlib import Path
+from typing import Any, Callable, Iterable, TextIO
+
+# Constants for compression detection
+_GZIP_MAGIC = b"\x1f\x8b"
+_XZ_MAGIC = b"\xfd7zXZ\x00"
+_GZIP_SUFFIXES = {".gz", ".gzip"}
+_LZMA_SUFFIXES = {".xz", ".lzma"}
+
+# Characters read from file at once while streaming
+_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# Characters number may continue with ("1234." or "1e" are cut numbers)
+_NUMBER_TAIL = re.compile(r"[0-9.eE+-]*")
+_decoder = json.JSONDecoder()
+
+
+def open_db_file(file_path: Path, mode: str = "r") -> TextIO:
+    """Open DB file as UTF-8 text stream, (de)compressing on the fly.
+    Compression is detected by magic bytes when reading and by file
+    extension (.gz, .xz, .lzma) when writing.
+    Args:
+        mode: 'r' or 'w'
+    """
+    if mode == "r":
+        with open(file_path, "rb") as file:
+            magic = file.read(len(_XZ_MAGIC))
+        if magic.startswith(_GZIP_MAGIC):
+            return gzip.open(file_path, "rt", encoding="utf-8")  # type: ignore
+        if magic.startswith(_XZ_MAGIC):
+            return lzma.open(file_path, "rt", encoding="utf-8")  # type: ignore
+        return open(file_path, "r", encoding="utf-8")
+
+    suffix = Path(file_path).suffix.lower()
+    if suffix in _GZIP_SUFFIXES:
+        return gzip.open(file_path, "wt", encoding="utf-8")  # type: ignore
+    if suffix in _LZMA_SUFFIXES:
+        return lzma.open(file_path, "wt", encoding="utf-8")  # type: ignore
+    return open(file_path, "w", encoding="utf-8")
+
+
+def dump_json_streaming(
+    file: TextIO,
+    arrays: dict[str, Iterable[Any]],
+    values: dict[str, Any],
+    indent: int | None = None,
+) -> None:
+    """Write JSON object to file element by element.
+    Arrays are consumed lazily, so only one element is encoded at a time.
+    Args:
+        arrays: keys with iterables written as JSON arrays (written first)
+        values: other keys of object
+        indent: None for compact JSON
+    """
+    separators = (",", ":") if indent is None else (",", ": ")
+    newline = "" if indent is None else "\n"
+    padding = "" if indent is None else " " * indent
+
+    def encode(value: Any, level: int) -> str:
+        text = json.dumps(
+            value, indent=indent, separators=separators, ensure_ascii=False
+        )
+        return text.replace("\n", "\n" + padding * level)
+
+    file.write("{")
+    first_key = True
+    for key, items in arrays.items():
+        file.write(("" if first_key else ",") + newline + padding)
+        file.write(encode(key, 1) + separators[1] + "[")
+        first_key = False
+        empty = True
+        for item in items:
+            file.write(("" if empty else ",") + newline + padding * 2)
+            file.write(encode(item, 2))
+            empty = False
+        file.write("]" if empty else newline + padding + "]")
+    for key, value in values.items():
+        file.write(("" if first_key else ",") + newline + padding)
+        file.write(encode(key, 1) + separators[1] + encode(value, 1))
+        first_key = False
+    file.write(newline + "}")
+
+
+def load_json_streaming(
+    file: TextIO, array_handlers: dict[str, Callable[[Any], None]]
+) -> dict[str, Any]:
+    """Read JSON object from file without reading whole text to memory.
+    Elements of arrays under keys from array_handlers are decoded one by one
+    and passed to handler; such keys have None value in result.
+    Raises:
+        json.JSONDecodeError: If JSON is invalid or it is not an object
+    """
+    reader = _JsonStreamReader(file)
+    result: dict[str, Any] = {}
+
+    reader.expect("{")
+    if reader.peek() == "}":
+        reader.advance()
+    else:
+        while True:
+            key = reader.value()
+            if not isinstance(key, str):
+                raise reader.error("Expecting property name")
+            reader.expect(":")
+            if key in array_handlers and reader.peek() == "[":
+                reader.advance()
+                if reader.peek() == "]":
+                    reader.advance()
+                else:
+                    while True:
+                        array_handlers[key](reader.value())
+                        if reader.peek() != ",":
+                            break
+                        reader.advance()
+                    reader.expect("]")
+                result[key] = None
+            else:
+                result[key] = reader.value()
+            if reader.peek() != ",":
+                break
+            reader.advance()
+        reader.expect("}")
+
+    if not reader.at_end():
+        raise reader.error("Extra data")
+    return result
+
+
+class _JsonStreamReader:
+    """Reads JSON tokens from text stream keeping only small buffer"""
+
+    def __init__(self, file: TextIO) -> None:
+        self._file = file
+        self._buffer = ""
+        self._position = 0
+        self._eof = False
+
+    def error(self, message: str) -> json.JSONDecodeError:
+        """Decode error at current position"""
+        return json.JSONDecodeError(message, self._buffer, self._position)
+
+    def peek(self) -> str:
+        """Next non-whitespace character"""
+        self._skip_whitespace()
+        if self._position >= len(self._buffer):
+            raise self.error("Unexpected end of data")
+        return self._buffer[self._position]
+
+    def advance(self) -> None:
+        """Skip peeked character"""
+        self._position += 1
+
+    def expect(self, char: str) -> None:
+        """Skip next character, it must be char"""
+        if self.peek() != char:
+            raise self.error(f"Expecting '{char}'")
+        self.advance()
+
+    def at_end(self) -> bool:
+        """Only whitespace left"""
+        self._skip_whitespace()
+        return self._position >= len(self._buffer)
+
+    def value(self) -> Any:
+        """Decode next JSON value.
+        Value that is cut by buffer end is decoded again after reading more
+        (read size doubles, so big values are still read in linear time)."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError:
+                if not self._fill(len(self._buffer)):
+                    raise
+                continue
+            # Numbers and literals may continue in next chunk
+            if _NUMBER_TAIL.fullmatch(self._buffer, end) and self._fill(
+                len(self._buffer)
+            ):
+                continue
+            self._position = end
+            return value
+
+    def _skip_whitespace(self) -> None:
+        """Move position to next non-whitespace character"""
+        while True:
+            match = _WHITESPACE.match(self._buffer, self._position)
+            self._position = match.end() if match else self._position
+            if self._position < len(self._buffer) or not self._fill():
+                return
+
+    def _fill(self, size: int = 0) -> bool:
+        """Drop consumed part of buffer and read more text.
+        Returns:
+            False on end of file"""
+        if self._eof:
+            return False
+        chunk = self._file.read(max(size, _CHUNK_SIZE))
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._position :] + chunk
+        self._position = 0
+        return True
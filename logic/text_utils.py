@@ -0,0 +1,55 @@
+"""Text utilities (normalized keys for duplicate detection)"""
+
+import unicodedata
+
+# Common abbreviations in names and addresses -> full form
+_ABBREVIATIONS = {
+    "st": "street",
+    "str": "street",
+    "ave": "avenue",
+    "av": "avenue",
+    "rd": "road",
+    "blvd": "boulevard",
+    "ln": "lane",
+    "dr": "drive",
+    "sq": "square",
+    "pl": "place",
+    "hwy": "highway",
+    "bldg": "building",
+    "lib": "library",
+    "ул": "улица",
+    "пр": "проспект",
+    "просп": "проспект",
+    "пер": "переулок",
+    "пл": "площадь",
+    "ш": "шоссе",
+    "наб": "набережная",
+    "д": "дом",
+    "г": "город",
+    "библ": "библиотека",
+}
+
+
+class _SeparatorsTable(dict[int, str]):
+    """str.translate table replacing punctuation, symbols and whitespace
+    with spaces (other characters are kept). Category of every character is
+    looked up only once."""
+
+    def __missing__(self, code: int) -> str:
+        char = chr(code)
+        separator = char.isspace() or unicodedata.category(char)[0] in "PSZ"
+        self[code] = " " if separator else char
+        return self[code]
+
+
+_SEPARATORS = _SeparatorsTable()
+
+
+def normalize_key(text: str) -> str:
+    """Get normalized key of text for duplicate detection.
+
+    Text is NFKC-normalized and casefolded, punctuation and whitespace are
+    collapsed to single spaces and common abbreviations are expanded, so
+    "Main St. 5" and "main  street 5 " give the same key."""
+    text = unicodedata.normalize("NFKC", text).casefold().translate(_SEPARATORS)
+    return " ".join(_ABBREVIATIONS.get(word, word) for word in text.split())
@@ -0,0 +1,385 @@
+"""Synthetic registries and workload replay (for load testing)"""
+
+import json
+import logging
+import random
+import time
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterator
+
+from logic.db_logic import (
+    LibraryDatabase,
+    DatabaseException,
+    EDIT_TYPE_NAME,
+    EDIT_TYPE_CITY,
+    EDIT_TYPE_ADDRESS,
+    VALID_SORT_FIELDS,
+)
+
+# Constants for operation names
+OPERATION_ADD = "add"
+OPERATION_EDIT = "edit"
+OPERATION_DELETE = "delete"
+OPERATION_LIST = "list"
+OPERATION_SEARCH = "search"
+OPERATION_VERIFY = "verify"
+VALID_OPERATIONS = {
+    OPERATION_ADD,
+    OPERATION_EDIT,
+    OPERATION_DELETE,
+    OPERATION_LIST,
+    OPERATION_SEARCH,
+    OPERATION_VERIFY,
+}
+# Number of arguments of replayed operations
+_OPERATION_ARGS_COUNTS = {
+    OPERATION_ADD: 3,  # name, city, address
+    OPERATION_EDIT: 3,  # name, edit type, new value
+    OPERATION_DELETE: 1,  # name
+    OPERATION_LIST: 3,  # order_by, offset, descending
+    OPERATION_SEARCH: 1,  # query
+    OPERATION_VERIFY: 1,  # password
+}
+# Not replayed operations, only measured
+OPERATION_SAVE = "save"
+OPERATION_LOAD = "load"
+OPERATION_IMPORT = "import"
+
+# Password verification is slow on purpose (PBKDF2), so it is rare by default
+DEFAULT_MIX = {
+    OPERATION_ADD: 20.0,
+    OPERATION_EDIT: 20.0,
+    OPERATION_DELETE: 10.0,
+    OPERATION_LIST: 45.0,
+    OPERATION_SEARCH: 5.0,
+    OPERATION_VERIFY: 0.1,
+}
+DEFAULT_CITIES = [
+    "Moscow",
+    "Saint Petersburg",
+    "Novosibirsk",
+    "Yekaterinburg",
+    "Kazan",
+    "Nizhny Novgorod",
+    "Chelyabinsk",
+    "Samara",
+    "Omsk",
+    "Rostov-on-Don",
+    "Ufa",
+    "Krasnoyarsk",
+    "Voronezh",
+    "Perm",
+    "Volgograd",
+]
+BENCHMARK_PASSWORD = "benchmark"
+LIST_PAGE_SIZE = 50
+
+_STREETS = ["Lenina", "Pushkina", "Gagarina", "Mira", "Sadovaya", "Lesnaya"]
+_STREET_TYPES = ["St.", "Ave.", "Blvd.", "Lane", "Sq."]
+_NAME_WORDS = ["Central", "City", "Public", "Children's", "Science", "Regional"]
+_REGISTRY_HEADER_KEY = "registry"
+
+
+@dataclass
+class RegistryParams:
+    """Parameters of synthetic registry (same params give same registry)"""
+
+    size: int
+    city_weights: dict[str, float]
+    seed: int
+
+
+@dataclass
+class WorkloadOperation:
+    """One operation of workload"""
+
+    name: str
+    args: list[Any] = field(default_factory=list)
+
+
+@dataclass
+class OperationStats:
+    """Latencies of one operation kind"""
+
+    name: str
+    latencies_ns: list[int] = field(default_factory=list)
+    errors: int = 0
+
+    def percentile(self, percent: float) -> float:
+        """Latency percentile (nearest rank) in milliseconds"""
+        if not self.latencies_ns:
+            return 0.0
+        ordered = sorted(self.latencies_ns)
+        rank = max(int(-(-percent * len(ordered) // 100)) - 1, 0)
+        return ordered[rank] / 1_000_000
+
+
+def zipf_city_weights(cities: list[str]) -> dict[str, float]:
+    """Zipf-like city sizes: first city is biggest, second is two times smaller..."""
+    return {city: 1 / rank for rank, city in enumerate(cities, start=1)}
+
+
+def parse_weights(text: str) -> dict[str, float]:
+    """Parse 'key=weight,key=weight' string.
+    Raises:
+        ValueError: If string format or weight is invalid
+    """
+    weights: dict[str, float] = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        key, separator, weight = part.partition("=")
+        if not separator or not key.strip():
+            raise ValueError(f"Expected 'key=weight', got '{part}'")
+        weights[key.strip()] = float(weight)
+        if weights[key.strip()] < 0:
+            raise ValueError(f"Weight can not be negative: '{part}'")
+    return weights
+
+
+def generate_registry(params: RegistryParams) -> Iterator[tuple[str, str, str]]:
+    """Generate unique libraries with given city distribution.
+    Yields:
+        tuples (name, city, address)
+    """
+    rng = random.Random(params.seed)
+    cities = list(params.city_weights)
+    weights = list(params.city_weights.values())
+    for number in range(params.size):
+        city = rng.choices(cities, weights)[0]
+        yield (
+            f"{rng.choice(_NAME_WORDS)} Library #{number}",
+            city,
+            _address(rng, number),
+        )
+
+
+def generate_operations(
+    count: int,
+    mix: dict[str, float],
+    names: list[str],
+    cities: list[str],
+    seed: int,
+) -> list[WorkloadOperation]:
+    """Generate operations for registry with given library names.
+    Names are tracked while generating, so edits and deletes target libraries
+    that exist at that moment.
+    Raises:
+        ValueError: If mix contains unknown operations or has no positive weights
+    """
+    unknown = set(mix) - VALID_OPERATIONS
+    if unknown:
+        raise ValueError(f"Unknown operations {unknown}. Valid: {VALID_OPERATIONS}")
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError("At least one operation must have positive weight.")
+
+    rng = random.Random(seed)
+    names = list(names)
+    operation_names = list(mix)
+    weights = list(mix.values())
+    next_number = len(names)
+    operations: list[WorkloadOperation] = []
+
+    for _ in range(count):
+        name = rng.choices(operation_names, weights)[0]
+        if name in (OPERATION_EDIT, OPERATION_DELETE) and not names:
+            name = OPERATION_ADD
+
+        if name == OPERATION_ADD:
+            lib_name = f"New Library #{next_number}"
+            city = rng.choice(cities)
+            operations.append(
+                WorkloadOperation(name, [lib_name, city, _address(rng, next_number)])
+            )
+            names.append(lib_name)
+            next_number += 1
+        elif name == OPERATION_EDIT:
+            position = rng.randrange(len(names))
+            edit_type = rng.choice([EDIT_TYPE_NAME, EDIT_TYPE_CITY, EDIT_TYPE_ADDRESS])
+            if edit_type == EDIT_TYPE_NAME:
+                new_value = f"Renamed Library #{next_number}"
+                operations.append(
+                    WorkloadOperation(name, [names[position], edit_type, new_value])
+                )
+                names[position] = new_value
+            else:
+                new_value = (
+                    rng.choice(cities)
+                    if edit_type == EDIT_TYPE_CITY
+                    else _address(rng, next_number)
+                )
+                operations.append(
+                    WorkloadOperation(name, [names[position], edit_type, new_value])
+                )
+            next_number += 1
+        elif name == OPERATION_DELETE:
+            position = rng.randrange(len(names))
+            names[position], names[-1] = names[-1], names[position]
+            operations.append(WorkloadOperation(name, [names.pop()]))
+        elif name == OPERATION_LIST:
+            order_by = rng.choice(sorted(VALID_SORT_FIELDS) + [None])  # type: ignore
+            offset = rng.randrange(max(len(names), 1))
+            operations.append(
+                WorkloadOperation(name, [order_by, offset, rng.random() < 0.5])
+            )
+        elif name == OPERATION_SEARCH:
+            query = f"{rng.choice(_NAME_WORDS)} {rng.choice(cities)}"
+            operations.append(WorkloadOperation(name, [query]))
+        elif name == OPERATION_VERIFY:
+            password = BENCHMARK_PASSWORD if rng.random() < 0.5 else "wrong"
+            operations.append(WorkloadOperation(name, [password]))
+    return operations
+
+
+def save_operations(
+    file_path: Path, params: RegistryParams, operations: list[WorkloadOperation]
+) -> None:
+    """Record workload to JSONL file (first line holds registry params)"""
+    with open(file_path, "w", encoding="utf-8") as file:
+        header = {
+            _REGISTRY_HEADER_KEY: {
+                "size": params.size,
+                "city_weights": params.city_weights,
+                "seed": params.seed,
+            }
+        }
+        file.write(json.dumps(header, ensure_ascii=False) + "\n")
+        for operation in operations:
+            line = {"op": operation.name, "args": operation.args}
+            file.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+
+def load_operations(
+    file_path: Path,
+) -> tuple[RegistryParams | None, list[WorkloadOperation]]:
+    """Read recorded or hand-written workload from JSONL file.
+    Registry params line is optional.
+    Raises:
+        ValueError: If file contains unknown operations or invalid JSON
+        ValueError: If operation has wrong number of arguments
+        KeyError: If line structure is invalid
+    """
+    params = None
+    operations: list[WorkloadOperation] = []
+    with open(file_path, "r", encoding="utf-8") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            if _REGISTRY_HEADER_KEY in data:
+                registry = data[_REGISTRY_HEADER_KEY]
+                params = RegistryParams(
+                    registry["size"], registry["city_weights"], registry["seed"]
+                )
+                continue
+            name, args = data["op"], data.get("args", [])
+            if name not in VALID_OPERATIONS:
+                raise ValueError(f"Unknown operation '{name}' in {file_path}")
+            if not isinstance(args, list) or len(args) != _OPERATION_ARGS_COUNTS[name]:
+                raise ValueError(
+                    f"Operation '{name}' in {file_path} needs "
+                    f"{_OPERATION_ARGS_COUNTS[name]} arguments, got {args!r}"
+                )
+            operations.append(WorkloadOperation(name, args))
+    return params, operations
+
+
+def prepare_database(
+    params: RegistryParams, db_path: Path, stats: dict[str, OperationStats]
+) -> LibraryDatabase:
+    """Import synthetic registry, save it to db_path and load it back.
+    Import, save and load times are added to stats."""
+    builder = LibraryDatabase()
+    builder.update_admin_password(BENCHMARK_PASSWORD)
+    registry = list(generate_registry(params))
+    _timed(stats, OPERATION_IMPORT, builder.add_libraries, registry)
+    _timed(stats, OPERATION_SAVE, builder.save_data, db_path)
+    del builder, registry
+
+    db = LibraryDatabase()
+    _timed(stats, OPERATION_LOAD, db.load_data, db_path, False)
+    return db
+
+
+def replay(
+    db: LibraryDatabase,
+    operations: list[WorkloadOperation],
+    stats: dict[str, OperationStats],
+    db_path: Path | None = None,
+    save_every: int = 0,
+) -> float:
+    """Run operations against DB, collecting latencies to stats.
+    Failed operations (e.g. hand-written ones for missing libraries) are
+    counted as errors.
+    Args:
+        save_every: save DB to db_path after every N changes (0 - never)
+    Returns:
+        total run time in seconds
+    """
+    handlers = {
+        OPERATION_ADD: db.add_library,
+        OPERATION_EDIT: db.edit_library_data,
+        OPERATION_DELETE: db.delete_library,
+        OPERATION_LIST: lambda order_by, offset, descending: db.get_libs_page(
+            order_by, offset, LIST_PAGE_SIZE, descending
+        ),
+        OPERATION_SEARCH: db.search_libraries,
+        OPERATION_VERIFY: db.verify_password,
+    }
+    changes = 0
+    started = time.perf_counter()
+    for operation in operations:
+        _timed(stats, operation.name, handlers[operation.name], *operation.args)
+        if operation.name in (OPERATION_ADD, OPERATION_EDIT, OPERATION_DELETE):
+            changes += 1
+            if db_path and save_every and changes % save_every == 0:
+                _timed(stats, OPERATION_SAVE, db.save_data, db_path)
+    return time.perf_counter() - started
+
+
+def format_report(
+    stats: dict[str, OperationStats], replayed: int, total_seconds: float
+) -> str:
+    """Format throughput and latency percentiles table"""
+    lines = [
+        f"Replayed {replayed} operations in {total_seconds:.3f} s "
+        f"({replayed / total_seconds if total_seconds else 0:.1f} ops/s)",
+        "",
+        f"{'operation':<10}{'count':>9}{'errors':>8}{'ops/s':>11}"
+        f"{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}",
+    ]
+    for name, operation_stats in stats.items():
+        count = len(operation_stats.latencies_ns)
+        busy_seconds = sum(operation_stats.latencies_ns) / 1_000_000_000
+        lines.append(
+            f"{name:<10}{count:>9}{operation_stats.errors:>8}"
+            f"{count / busy_seconds if busy_seconds else 0:>11.1f}"
+            f"{operation_stats.percentile(50):>10.3f}"
+            f"{operation_stats.percentile(90):>10.3f}"
+            f"{operation_stats.percentile(99):>10.3f}"
+            f"{operation_stats.percentile(100):>10.3f}"
+        )
+    return "\n".join(lines)
+
+
+def _timed(
+    stats: dict[str, OperationStats], name: str, function: Any, *args: Any
+) -> None:
+    """Call function measuring its latency.
+    Hand-written arguments of wrong type are counted as errors too."""
+    operation_stats = stats.setdefault(name, OperationStats(name))
+    started = time.perf_counter_ns()
+    try:
+        function(*args)
+    except (ValueError, TypeError, DatabaseException) as e:
+        logging.debug(f"Workload operation {name}{args} failed: {e}")
+        operation_stats.errors += 1
+    operation_stats.latencies_ns.append(time.perf_counter_ns() - started)
+
+
+def _address(rng: random.Random, number: int) -> str:
+    """Random address, unique for number"""
+    street = f"{rng.choice(_STREETS)} {rng.choice(_STREET_TYPES)}"
+    return f"{street} {number // 100 + 1}, bldg. {number % 100 + 1}"
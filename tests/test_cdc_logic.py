@@ -0,0 +1,129 @@
+"""Tests of libraries change feed"""
+
+import tempfile
+import unittest
+
+from pathlib import Path
+
+from logic.cdc_logic import (
+    CHANGE_ADDED,
+    CHANGE_DELETED,
+    CHANGE_RELOADED,
+    CHANGE_UPDATED,
+    ChangeFeedReader,
+    ChangeFeedWriter,
+    DataLossError,
+)
+from logic.events_logic import (
+    DatabaseReloaded,
+    DatabaseSaved,
+    LibraryAdded,
+    LibraryDeleted,
+    LibraryUpdated,
+)
+
+
+def _info(number: int) -> tuple[str, str, str]:
+    return (f"Library {number}", "City", f"Street {number}")
+
+
+class ChangeFeedTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()
+        self.feed_dir = Path(self._directory.name)
+
+    def tearDown(self) -> None:
+        self._directory.cleanup()
+
+    def _save(self, writer: ChangeFeedWriter, first: int, count: int) -> None:
+        """Add libraries first..first + count - 1 and save them"""
+        for number in range(first, first + count):
+            writer(LibraryAdded(_info(number)))
+        writer(DatabaseSaved())
+
+    def test_changes_are_written_on_save_only(self) -> None:
+        writer = ChangeFeedWriter(self.feed_dir)
+        reader = ChangeFeedReader(self.feed_dir)
+        writer(LibraryAdded(_info(1)))
+        writer(LibraryUpdated(_info(1), _info(2)))
+        self.assertEqual(reader.read_changes(), [])
+        writer(LibraryDeleted(_info(2)))
+        writer(DatabaseSaved())
+
+        changes = reader.read_changes()
+        self.assertEqual([change.seq for change in changes], [1, 2, 3])
+        self.assertEqual(
+            [change.kind for change in changes],
+            [CHANGE_ADDED, CHANGE_UPDATED, CHANGE_DELETED],
+        )
+        self.assertEqual(changes[1].info, _info(2))
+        self.assertEqual(changes[1].old_info, _info(1))
+        self.assertEqual(reader.last_seq, 3)
+
+    def test_reload_drops_unsaved_changes(self) -> None:
+        writer = ChangeFeedWriter(self.feed_dir)
+        writer(LibraryAdded(_info(1)))
+        writer(DatabaseReloaded())
+        changes = ChangeFeedReader(self.feed_dir).read_changes()
+        self.assertEqual([(c.seq, c.kind) for c in changes], [(1, CHANGE_RELOADED)])
+
+    def test_rotation_and_resume(self) -> None:
+        # Every save starts new file, as each file is over 1 byte
+        writer = ChangeFeedWriter(self.feed_dir, max_file_size=1, max_files=100)
+        reader = ChangeFeedReader(self.feed_dir)
+        for save in range(5):
+            self._save(writer, save * 3 + 1, 3)
+        self.assertEqual(len(list(self.feed_dir.iterdir())), 5)
+
+        first = reader.read_changes(limit=4)
+        self.assertEqual([change.seq for change in first], [1, 2, 3, 4])
+        # Reader started again from saved position continues after it
+        resumed = ChangeFeedReader(self.feed_dir, reader.last_seq)
+        self.assertEqual([c.seq for c in resumed.read_changes()], list(range(5, 16)))
+        self.assertEqual([c.seq for c in reader.read_changes(limit=2)], [5, 6])
+
+        self._save(writer, 16, 2)
+        self.assertEqual([c.seq for c in resumed.read_changes()], [16, 17])
+        self.assertEqual(resumed.read_changes(), [])
+
+    def test_reader_follows_growing_file(self) -> None:
+        writer = ChangeFeedWriter(self.feed_dir)
+        reader = ChangeFeedReader(self.feed_dir)
+        self._save(writer, 1, 2)
+        self.assertEqual([c.seq for c in reader.read_changes()], [1, 2])
+        self._save(writer, 3, 2)
+        self.assertEqual([c.seq for c in reader.read_changes()], [3, 4])
+
+    def test_rotated_away_changes_raise_data_loss(self) -> None:
+        writer = ChangeFeedWriter(self.feed_dir, max_file_size=1, max_files=2)
+        for save in range(4):
+            self._save(writer, save * 2 + 1, 2)
+        self.assertEqual(len(list(self.feed_dir.iterdir())), 2)
+
+        with self.assertRaises(DataLossError):
+            ChangeFeedReader(self.feed_dir).read_changes()
+        kept = ChangeFeedReader(self.feed_dir, last_seq=4).read_changes()
+        self.assertEqual([change.seq for change in kept], [5, 6, 7, 8])
+
+    def test_writer_resumes_sequence_and_drops_cut_line(self) -> None:
+        self._save(ChangeFeedWriter(self.feed_dir), 1, 3)
+        feed_file = next(self.feed_dir.iterdir())
+        with open(feed_file, "a", encoding="utf-8") as file:
+            file.write('{"seq": 4, "kind": "add')  # Crash while writing
+
+        reader = ChangeFeedReader(self.feed_dir)
+        self.assertEqual([change.seq for change in reader.read_changes()], [1, 2, 3])
+        writer = ChangeFeedWriter(self.feed_dir)
+        self.assertEqual(writer.last_seq, 3)
+        self._save(writer, 4, 1)
+        self.assertEqual([change.seq for change in reader.read_changes()], [4])
+
+    def test_invalid_limits_are_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            ChangeFeedWriter(self.feed_dir, max_file_size=0)
+        with self.assertRaises(ValueError):
+            ChangeFeedWriter(self.feed_dir, max_files=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+"""Tests of copy-on-write versioned containers"""
+
+import random
+import unittest
+
+from logic.mvcc_logic import (
+    Snapshot,
+    SortedView,
+    VersionedDict,
+    VersionedSortedList,
+    VersionStore,
+)
+
+
+class VersionedSortedListTest(unittest.TestCase):
+    def test_frozen_views_do_not_change_after_writes(self) -> None:
+        rng = random.Random(1)
+        versioned = VersionedSortedList(rng.sample(range(1000), 50), chunk_size=4)
+        expected = sorted(versioned)
+        frozen: list[tuple[SortedView, list[int]]] = []
+        for step in range(2000):
+            if expected and rng.random() < 0.45:
+                entry = rng.choice(expected)
+                self.assertTrue(versioned.remove(entry))
+                expected.remove(entry)
+            else:
+                entry = rng.randrange(1000)
+                versioned.add(entry)
+                expected.append(entry)
+                expected.sort()
+            if step % 50 == 0:
+                frozen.append((versioned.freeze(), list(expected)))
+
+        self.assertEqual(list(versioned), expected)
+        for view, entries in frozen:
+            self.assertEqual(list(view), entries)
+            self.assertEqual(len(view), len(entries))
+            self.assertEqual(view[:], entries)
+            self.assertEqual(view[3:17], entries[3:17])
+            if entries:
+                self.assertEqual(view[len(entries) // 2], entries[len(entries) // 2])
+                self.assertEqual(view[-1], entries[-1])
+            for probe in (-1, 0, 500, 1000):
+                index = view.bisect_left(probe)
+                self.assertEqual(index, sum(entry < probe for entry in entries))
+
+    def test_freeze_is_cached_until_change(self) -> None:
+        versioned = VersionedSortedList([3, 1, 2])
+        view = versioned.freeze()
+        self.assertIs(versioned.freeze(), view)
+        versioned.add(0)
+        self.assertIsNot(versioned.freeze(), view)
+        self.assertEqual(list(view), [1, 2, 3])
+
+    def test_writer_from_view_does_not_change_view(self) -> None:
+        view = SortedView.from_sorted(list(range(20)), chunk_size=4)
+        versioned = VersionedSortedList.from_view(view, chunk_size=4)
+        versioned.add(7)
+        self.assertTrue(versioned.remove(0))
+        self.assertFalse(versioned.remove(100))
+        self.assertEqual(list(view), list(range(20)))
+        self.assertEqual(list(versioned), sorted(list(range(1, 20)) + [7]))
+
+    def test_small_chunk_size_is_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            VersionedSortedList(chunk_size=3)
+
+
+class VersionedDictTest(unittest.TestCase):
+    def test_frozen_views_do_not_change_after_writes(self) -> None:
+        rng = random.Random(2)
+        versioned = VersionedDict(((key, key) for key in range(20)), shards_count=4)
+        expected = {key: key for key in range(20)}
+        frozen: list[tuple[object, dict[int, int]]] = []
+        for step in range(1000):
+            key = rng.randrange(50)
+            if rng.random() < 0.3:
+                versioned.discard(key)
+                expected.pop(key, None)
+            else:
+                versioned.set(key, step)
+                expected[key] = step
+            if step % 25 == 0:
+                frozen.append((versioned.freeze(), dict(expected)))
+
+        self.assertEqual(len(versioned), len(expected))
+        self.assertEqual(sorted(versioned.values()), sorted(expected.values()))
+        for view, items in frozen:
+            self.assertEqual(dict(view), items)  # type: ignore
+            self.assertEqual(len(view), len(items))  # type: ignore
+
+    def test_missing_key(self) -> None:
+        view = VersionedDict(shards_count=2).freeze()
+        self.assertNotIn("key", view)
+        with self.assertRaises(KeyError):
+            view["key"]
+
+
+class VersionStoreTest(unittest.TestCase):
+    def test_pinned_snapshot_stays_after_publish(self) -> None:
+        store = VersionStore()
+        pinned = store.pin()
+        libraries = VersionedSortedList([(1, "Lib", "City", "Address")])
+        published = store.publish(Snapshot(0, libraries.freeze()))
+        self.assertEqual(len(pinned), 0)
+        self.assertEqual(len(published), 1)
+        self.assertEqual(published.version, pinned.version + 1)
+        self.assertIs(store.pin(), published)
+
+
+if __name__ == "__main__":
+    unittest.main()
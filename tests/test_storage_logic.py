@@ -0,0 +1,110 @@
+"""Tests of DB files storage (streaming JSON and compression)"""
+
+import io
+import json
+import tempfile
+import unittest
+
+from pathlib import Path
+from typing import Any
+from unittest import mock
+
+from logic import storage_logic
+from logic.storage_logic import dump_json_streaming, load_json_streaming, open_db_file
+
+_DOCUMENT = {
+    "libraries_data": [
+        {"name": "Библиотека \"Центральная\"", "city": "Москва", "address": "ул. 1"},
+        {"name": "Tab\tand \\ slash ☃", "order": 1234567890, "ratio": -12.5e-3},
+        [],
+        {},
+        [True, False, None, 0, -0.25, 1e10],
+    ],
+    "administrator_password": "0123456789abcdef" * 4,
+    "statistics": {"city_counts": {"Москва": 1}, "empty": []},
+    "number": 98765.4321,
+    "flag": False,
+    "nothing": None,
+}
+
+
+class _TrickleStream(io.StringIO):
+    """Text stream returning at most step characters per read"""
+
+    def __init__(self, text: str, step: int) -> None:
+        super().__init__(text)
+        self._step = step
+
+    def read(self, size: int | None = -1) -> str:
+        return super().read(self._step)
+
+
+def _load(text: str, step: int) -> tuple[dict[str, Any], list[Any]]:
+    """Load text read by step characters, collecting libraries elements"""
+    elements: list[Any] = []
+    with mock.patch.object(storage_logic, "_CHUNK_SIZE", step):
+        result = load_json_streaming(
+            _TrickleStream(text, step), {"libraries_data": elements.append}
+        )
+    return result, elements
+
+
+class StreamingReaderTest(unittest.TestCase):
+    def test_tokens_split_at_every_chunk_boundary(self) -> None:
+        for indent in (None, 2):
+            text = json.dumps(_DOCUMENT, indent=indent, ensure_ascii=False)
+            for step in range(1, 12):
+                with self.subTest(indent=indent, step=step):
+                    result, elements = _load(text, step)
+                    self.assertEqual(elements, _DOCUMENT["libraries_data"])
+                    self.assertIsNone(result["libraries_data"])
+                    del result["libraries_data"]
+                    expected = dict(_DOCUMENT)
+                    del expected["libraries_data"]
+                    self.assertEqual(result, expected)
+
+    def test_number_at_chunk_end_is_not_cut(self) -> None:
+        for step in range(1, 8):
+            with self.subTest(step=step):
+                result, _ = _load('{"value": 1234567.125e2}', step)
+                self.assertEqual(result, {"value": 1234567.125e2})
+
+    def test_empty_object(self) -> None:
+        self.assertEqual(_load(" { } ", 1), ({}, []))
+
+    def test_invalid_json_is_rejected(self) -> None:
+        for text in ('{"a": [1, 2', '{"a": 1} []', '[1]', '{"a": tru}', '{1: 2}'):
+            for step in (1, 3, 64):
+                with self.subTest(text=text, step=step):
+                    with self.assertRaises(json.JSONDecodeError):
+                        _load(text, step)
+
+
+class DumpTest(unittest.TestCase):
+    def test_dump_is_read_back(self) -> None:
+        arrays = {"libraries_data": _DOCUMENT["libraries_data"], "empty": []}
+        values = {"administrator_password": "hash", "number": 1.5}
+        for indent in (None, 4):
+            with self.subTest(indent=indent):
+                stream = io.StringIO()
+                dump_json_streaming(stream, arrays, values, indent)
+                self.assertEqual(json.loads(stream.getvalue()), {**arrays, **values})
+
+    def test_compressed_files(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ("db.json", "db.json.gz", "db.json.xz"):
+                with self.subTest(name=name):
+                    path = Path(directory) / name
+                    with open_db_file(path, "w") as file:
+                        dump_json_streaming(file, {"items": range(1000)}, {"key": "Ключ"})
+                    # Compression is detected by content, not by name
+                    moved = path.rename(Path(directory) / "moved")
+                    with open_db_file(moved) as file:
+                        items: list[Any] = []
+                        result = load_json_streaming(file, {"items": items.append})
+                    self.assertEqual(items, list(range(1000)))
+                    self.assertEqual(result, {"items": None, "key": "Ключ"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+"""Load testing tool: synthetic registry + workload replay.
+
+Examples:
+    python3 workload_bench.py --size 100000 --operations 20000
+    python3 workload_bench.py --size 100000 --db-path bench.json.gz --save-every 100
+    python3 workload_bench.py --cities "Moscow=5,Kazan=1" --record workload.jsonl
+    python3 workload_bench.py --replay workload.jsonl --db-path bench.json.xz
+"""
+
+import sys
+import logging
+import argparse
+import tempfile
+from pathlib import Path
+
+from logic.workload_logic import (
+    DEFAULT_CITIES,
+    DEFAULT_MIX,
+    RegistryParams,
+    OperationStats,
+    zipf_city_weights,
+    parse_weights,
+    generate_operations,
+    save_operations,
+    load_operations,
+    prepare_database,
+    replay,
+    format_report,
+)
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic libraries registry and replay workload "
+        "against LibraryDatabase, reporting throughput and latency percentiles."
+    )
+    parser.add_argument("--size", type=int, default=10_000, help="libraries count")
+    parser.add_argument(
+        "--cities",
+        help="city distribution 'city=weight,...' (default: Zipf over 15 cities)",
+    )
+    parser.add_argument(
+        "--operations", type=int, default=10_000, help="operations to generate"
+    )
+    parser.add_argument(
+        "--mix",
+        help="operation weights 'add=20,edit=20,delete=10,list=45,search=5,verify=0.1'",
+    )
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    parser.add_argument(
+        "--db-path",
+        type=Path,
+        help="DB file (.json, .json.gz or .json.xz), temporary file by default",
+    )
+    parser.add_argument(
+        "--save-every", type=int, default=0, help="save DB after every N changes"
+    )
+    parser.add_argument("--record", type=Path, help="write generated workload (JSONL)")
+    parser.add_argument(
+        "--replay", type=Path, help="replay recorded or scripted workload (JSONL)"
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Run benchmark, print report"""
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s: %(message)s")
+    args = parse_args()
+
+    try:
+        city_weights = (
+            parse_weights(args.cities)
+            if args.cities
+            else zipf_city_weights(DEFAULT_CITIES)
+        )
+        mix = parse_weights(args.mix) if args.mix else DEFAULT_MIX
+        params = RegistryParams(args.size, city_weights, args.seed)
+        operations = []
+        if args.replay:
+            recorded_params, operations = load_operations(args.replay)
+            params = recorded_params if recorded_params else params
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = args.db_path if args.db_path else Path(temp_dir) / "bench.json"
+        stats: dict[str, OperationStats] = {}
+        print(f"Preparing registry of {params.size} libraries in {db_path}...")
+        db = prepare_database(params, db_path, stats)
+
+        if not args.replay:
+            try:
+                operations = generate_operations(
+                    args.operations,
+                    mix,
+                    [info[0] for info in db.get_readable_libs_info()],
+                    list(params.city_weights),
+                    args.seed,
+                )
+            except ValueError as e:
+                print(f"Error: {e}", file=sys.stderr)
+                return 1
+            if args.record:
+                save_operations(args.record, params, operations)
+                print(f"Workload recorded to {args.record}")
+
+        total_seconds = replay(db, operations, stats, db_path, args.save_every)
+
+    print(format_report(stats, len(operations), total_seconds))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())